@@ -7,182 +7,655 @@
 # to help spot patterns and generate insights from test results.
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional, Tuple
+import numpy as np
 import pandas as pd
-from openai import OpenAI
-import json
+from openai import AsyncOpenAI, RateLimitError
+import asyncio
+import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import wraps
 from dotenv import load_dotenv
+from cache_utils import ResponseCache, make_cache_key
+import json_utils
+
+logger = logging.getLogger(__name__)
 
 # Grab env vars
 load_dotenv()
 
-# Set up OpenAI - using their official API
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    base_url="https://api.openai.com/v1"
-)
+# The OpenAI client for the run in progress - opened and closed by openai_session
+_current_client: ContextVar[Optional[AsyncOpenAI]] = ContextVar("openai_client", default=None)
 
-def create_analysis_prompt(df: pd.DataFrame) -> str:
+@asynccontextmanager
+async def openai_session():
     """
-    Builds the prompt sent to GPT-4o for analyzing QA data.
-    Takes  test results and formats them in a way the model can understand.
+    Opens an async OpenAI client (using their official API) for the requests inside the
+    block, so they all share one connection pool, and closes it on the way out.
+    httpx pools can't be reused across event loops and every asyncio.run() has a new one,
+    so a client only lives as long as the run. Nested sessions reuse the outer client.
     """
+    client = _current_client.get()
+    if client is not None:
+        yield client
+        return
     
-    # Get active issues
-    active_issues = df[
-        (df["Merged With Issue ID"].isna()) |  # Unmerged issues
-        (df["Status"].fillna("").str.strip() == "Merged")  # Merged groups
-    ]
-    
-    # Get summary statistics
-    total_active = len(active_issues)
-    merged_groups = len(active_issues[active_issues["Status"].fillna("").str.strip() == "Merged"])
-    unmerged_issues = total_active - merged_groups
-    standards = active_issues["Linked Standard"].unique().tolist()
-    
-    # Get issues grouped by standard
-    issues_by_standard = {}
-    for standard in standards:
-        standard_issues = active_issues[active_issues["Linked Standard"] == standard]
-        issues_by_standard[standard] = [
-            {
-                "issue_id": str(row["Issue ID"]),
-                "input_prompt": str(row["Input Prompt"]),
-                "failure_rationale": str(row["Failure Rationale"]) if pd.notna(row["Failure Rationale"]) else None,
-                "score": float(row["Final Weighted Score (1-3)"]) if pd.notna(row["Final Weighted Score (1-3)"]) else None,
-                "status": str(row["Status"]) if pd.notna(row["Status"]) else None,
-                "is_merged_group": str(row["Status"]).strip() == "Merged" if pd.notna(row["Status"]) else False  # Handle NA for individual rows
-            }
-            for _, row in standard_issues.iterrows()
-        ]
-    
-    return f"""Analyze the following QA testing dataset for a mental health support chatbot named Suzy and identify key patterns, priorities, and recommendations.
+    # Checked here rather than at import so the app can still load and show the error
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    client = AsyncOpenAI(
+        api_key=api_key,
+        base_url="https://api.openai.com/v1"
+    )
+    token = _current_client.set(client)
+    try:
+        yield client
+    finally:
+        _current_client.reset(token)
+        await client.close()
 
-Dataset Overview:
-- Total Active Issues: {total_active}
-  * Merged Issue Groups: {merged_groups}
-  * Individual Unmerged Issues: {unmerged_issues}
-- Standards Evaluated: {len(standards)}
+def uses_openai_session(func):
+    """Runs an async function inside an openai_session"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with openai_session():
+            return await func(*args, **kwargs)
+    return wrapper
 
-Note: This analysis covers only active issues, which includes merged issue groups and unmerged individual issues.
-Individual issues that were merged into groups are not included to avoid redundancy.
+def get_async_client() -> AsyncOpenAI:
+    """Hands out the client of the current openai_session"""
+    client = _current_client.get()
+    if client is None:
+        raise RuntimeError("No OpenAI client open - call this inside openai_session()")
+    return client
 
-Detailed Issues by Standard:
-{json.dumps(issues_by_standard, indent=2)}
+# How many requests we let run at once - keep it under the account's rate limits
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+MAX_RETRIES = 5
+
+# How often to check on a Batch API job, and the states it can end in
+BATCH_POLL_SECONDS = 30
+BATCH_DONE_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Bigger datasets get split up so each request stays well inside the context window
+MAX_ROWS_PER_CHUNK = 200
+
+# Parsed analysis results from earlier runs, keyed by prompt hash
+response_cache = ResponseCache()
+
+# Keep model settings fixed so repeat runs can hit OpenAI's prompt cache
+MODEL = "gpt-4o"
+TEMPERATURE = 0.3
+
+# Static part of the analysis request. This goes first and never changes between
+# runs, so OpenAI's automatic prefix caching can skip re-processing it. Only the
+# dataset itself goes into the user message.
+ANALYSIS_SYSTEM_PROMPT = """You are an expert at analyzing QA testing data for conversational AI systems.
+Focus on:
+1. Identifying systemic issues and patterns
+2. Prioritizing areas for improvement
+3. Providing actionable recommendations
+4. Suggesting concrete steps for implementation
+
+Note: The analysis covers only active issues (merged groups and unmerged individuals).
+Consider merged groups as representing multiple related issues.
+
+You will be given a QA testing dataset for a mental health support chatbot named Suzy.
+Identify key patterns, priorities, and recommendations.
 
 Please provide your analysis in the following JSON format:
 
-{{
-    "summary": {{
+{
+    "summary": {
         "critical_findings": ["List of 3-5 most critical findings"],
-        "overall_assessment": "Brief overall assessment of chatbot performance",
-        "dataset_coverage": {{
-            "total_active_issues": {total_active},
-            "merged_groups": {merged_groups},
-            "unmerged_issues": {unmerged_issues},
-            "standards_count": {len(standards)}
-        }}
-    }},
+        "overall_assessment": "Brief overall assessment of chatbot performance"
+    },
     "standards_analysis": [
-        {{
+        {
             "standard": "Standard name",
             "total_issues": 123,
             "key_patterns": ["List of identified patterns"],
             "priority_level": "high/medium/low",
             "recommendations": ["List of specific recommendations"]
-        }}
+        }
     ],
     "priority_areas": [
-        {{
+        {
             "area": "Description of problem area",
             "affected_standards": ["List of affected standards"],
             "impact": "Description of user/system impact",
             "suggested_fixes": ["List of suggested fixes"],
             "priority_score": 0-100
-        }}
+        }
     ],
     "improvement_roadmap": [
-        {{
+        {
             "phase": "1/2/3",
             "focus_area": "Description of focus area",
             "actions": ["List of specific actions"],
             "expected_impact": "Description of expected impact",
             "complexity": "high/medium/low"
-        }}
+        }
     ]
-}}"""
+}"""
+
+def _strict_object(properties: Dict) -> Dict:
+    """Structured outputs wants every field required and nothing extra"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+_LEVEL = {"type": "string", "enum": ["high", "medium", "low"]}
+
+# JSON schema for the analysis reply - the API guarantees the output matches it
+ANALYSIS_SCHEMA = _strict_object({
+    "summary": _strict_object({
+        "critical_findings": _STRING_LIST,
+        "overall_assessment": {"type": "string"}
+    }),
+    "standards_analysis": {"type": "array", "items": _strict_object({
+        "standard": {"type": "string"},
+        "total_issues": {"type": "integer"},
+        "key_patterns": _STRING_LIST,
+        "priority_level": _LEVEL,
+        "recommendations": _STRING_LIST
+    })},
+    "priority_areas": {"type": "array", "items": _strict_object({
+        "area": {"type": "string"},
+        "affected_standards": _STRING_LIST,
+        "impact": {"type": "string"},
+        "suggested_fixes": _STRING_LIST,
+        "priority_score": {"type": "number"}
+    })},
+    "improvement_roadmap": {"type": "array", "items": _strict_object({
+        "phase": {"type": "string"},
+        "focus_area": {"type": "string"},
+        "actions": _STRING_LIST,
+        "expected_impact": {"type": "string"},
+        "complexity": _LEVEL
+    })}
+})
+
+ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "qa_analysis", "schema": ANALYSIS_SCHEMA, "strict": True}
+}
+
+# Columns the analysis reads - everything else is left behind
+ANALYSIS_COLUMNS = [
+    "Issue ID", "Input Prompt", "Failure Rationale", "Final Weighted Score (1-3)",
+    "Status", "Linked Standard", "Merged With Issue ID"
+]
+
+# Text columns that get converted to Arrow strings before analysis
+STRING_COLUMNS = ["Merged With Issue ID", "Issue ID", "Input Prompt", "Failure Rationale"]
+
+# Low-cardinality columns we group and compare on - cheaper as categories
+CATEGORY_COLUMNS = ["Status", "Linked Standard"]
+
+def get_merged_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    Flags rows whose Status is "Merged" (ignoring stray whitespace).
+    Compute this once and pass it around - the string ops aren't cheap on big frames.
+    """
+    status = df["Status"]
+    if isinstance(status.dtype, pd.CategoricalDtype):
+        # Only the (few) categories need stripping, then it's a code lookup
+        categories = status.cat.categories
+        return status.isin(categories[categories.astype(str).str.strip() == "Merged"])
+    if not isinstance(status.dtype, pd.StringDtype):
+        status = status.astype("string")
+    return status.str.strip().eq("Merged").fillna(False).astype(bool)
+
+def normalize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the text columns we filter on to Arrow-backed strings, Status and
+    Linked Standard to categories, and the score to a nullable float, so
+    strip/compare/groupby run in C instead of per Python object.
+    Returns a new frame - the caller's data is left alone.
+    """
+    converted = {
+        col: df[col].astype("string[pyarrow]")
+        for col in STRING_COLUMNS
+        if col in df.columns and df[col].dtype != "string[pyarrow]"
+    }
+    converted.update({
+        col: df[col].astype("category")
+        for col in CATEGORY_COLUMNS
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    })
+    if "Final Weighted Score (1-3)" in df.columns:
+        converted["Final Weighted Score (1-3)"] = pd.to_numeric(
+            df["Final Weighted Score (1-3)"], errors="coerce"
+        ).astype("Float64")
+    return df.assign(**converted)
+
+def create_analysis_prompt(df: pd.DataFrame, merged_mask: Optional[pd.Series] = None) -> str:
+    """
+    Builds the prompt sent to GPT-4o for analyzing QA data.
+    Takes  test results and formats them in a way the model can understand.
+    If merged_mask is given, df is assumed to already be the active issues.
+    """
+    
+    if merged_mask is None:
+        # Get active issues
+        merged_mask = get_merged_mask(df)
+        active_mask = df["Merged With Issue ID"].isna() | merged_mask  # Unmerged issues + merged groups
+        active_issues = df[active_mask]
+        merged_mask = merged_mask[active_mask]
+    else:
+        active_issues = df
+    
+    # Get summary statistics
+    total_active = len(active_issues)
+    merged_groups = int(merged_mask.sum())
+    unmerged_issues = total_active - merged_groups
+    standards_count = active_issues["Linked Standard"].nunique(dropna=False)
+    
+    # Build the per-issue records in one go instead of row by row (iterrows is slow)
+    records = active_issues[[
+        "Issue ID", "Input Prompt", "Failure Rationale",
+        "Final Weighted Score (1-3)", "Status", "Linked Standard"
+    ]].copy()
+    records["is_merged_group"] = merged_mask
+    records["Issue ID"] = records["Issue ID"].astype(str)
+    records["Input Prompt"] = records["Input Prompt"].astype(str)
+    for col in ["Failure Rationale", "Status"]:
+        # Missing values go to the model as null
+        records[col] = records[col].astype(str).astype(object).where(records[col].notna(), None)
+    score = pd.to_numeric(records["Final Weighted Score (1-3)"], errors="coerce")
+    records["Final Weighted Score (1-3)"] = score.astype(object).where(score.notna(), None)
+    records = records.rename(columns={
+        "Issue ID": "issue_id",
+        "Input Prompt": "input_prompt",
+        "Failure Rationale": "failure_rationale",
+        "Final Weighted Score (1-3)": "score",
+        "Status": "status"
+    })
+
+    # Write the issues grouped by standard straight into one JSON buffer - one
+    # groupby pass, and no big nested dict sitting in memory next to its string
+    issues_json = bytearray(b"{")
+    groups = records.groupby("Linked Standard", sort=False, observed=True)
+    for i, (standard, standard_issues) in enumerate(groups):
+        if i:
+            issues_json += b","
+        issues_json += b"\n  " + json_utils.dumps_bytes(str(standard)) + b": "
+        issues_json += json_utils.dumps_bytes(standard_issues.drop(columns="Linked Standard").to_dict(orient="records"))
+    issues_json += b"\n}"
+    
+    # Only the data goes here - the instructions and schema live in ANALYSIS_SYSTEM_PROMPT
+    return f"""Dataset Overview:
+- Total Active Issues: {total_active}
+  * Merged Issue Groups: {merged_groups}
+  * Individual Unmerged Issues: {unmerged_issues}
+- Standards Evaluated: {standards_count}
+
+Note: This analysis covers only active issues, which includes merged issue groups and unmerged individual issues.
+Individual issues that were merged into groups are not included to avoid redundancy.
+
+Detailed Issues by Standard:
+{issues_json.decode("utf-8")}"""
+
+def split_into_chunks(
+    active_issues: pd.DataFrame,
+    merged_mask: pd.Series,
+    chunk_by: Literal["standard", "rowcount"] = "standard",
+    max_rows_per_chunk: int = MAX_ROWS_PER_CHUNK
+) -> List[Tuple[pd.DataFrame, pd.Series]]:
+    """
+    Splits active issues into pieces small enough for one request each.
+    "standard" keeps each standard together (big standards get sliced further),
+    "rowcount" just cuts the data into max_rows_per_chunk slices.
+    Small datasets come back as a single chunk.
+    """
+    if len(active_issues) <= max_rows_per_chunk:
+        return [(active_issues, merged_mask)]
+    
+    if chunk_by == "standard":
+        groups = [
+            group.index
+            for _, group in active_issues.groupby("Linked Standard", sort=False, observed=True, dropna=False)
+        ]
+    else:
+        groups = [active_issues.index]
+    
+    chunks = []
+    for index in groups:
+        for start in range(0, len(index), max_rows_per_chunk):
+            chunk_index = index[start:start + max_rows_per_chunk]
+            chunks.append((active_issues.loc[chunk_index], merged_mask.loc[chunk_index]))
+    return chunks
+
+def build_chunk_prompt(chunk: pd.DataFrame, chunk_mask: pd.Series, part: int, total_parts: int) -> str:
+    """
+    Builds the prompt for one chunk - same layout as the full prompt, plus a
+    note telling the model it's only seeing part of the data.
+    """
+    prompt = create_analysis_prompt(chunk, chunk_mask)
+    if total_parts > 1:
+        prompt += f"""
+
+Note: This is part {part} of {total_parts} of the dataset. Analyze only the issues shown above."""
+    return prompt
+
+def parse_analysis_response(response_text: str) -> Dict:
+    """
+    Turns the raw model reply into a dict. The request uses structured outputs,
+    so the reply is always bare JSON matching ANALYSIS_SCHEMA.
+    """
+    return json_utils.loads(response_text)
+
+def _unique(items: List) -> List:
+    """Drops repeats but keeps the original order (dicts/lists are keyed by their JSON)"""
+    seen = set()
+    unique = []
+    for item in items:
+        key = item if isinstance(item, str) else json_utils.dumps(item)
+        if key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique
+
+def merge_chunk_results(chunk_results: List[Dict]) -> Dict:
+    """
+    Combines the analyses from each chunk into one result in the usual format.
+    Standards that show up in more than one chunk get folded together.
+    dataset_coverage is left for the caller since it needs the full dataset.
+    """
+    if len(chunk_results) == 1:
+        return chunk_results[0]
+    
+    priority_rank = {"high": 3, "medium": 2, "low": 1}
+    critical_findings = []
+    assessments = []
+    standards = {}
+    priority_areas = []
+    roadmap = []
+    
+    for result in chunk_results:
+        summary = result.get("summary", {})
+        critical_findings.extend(summary.get("critical_findings", []))
+        if summary.get("overall_assessment"):
+            assessments.append(summary["overall_assessment"])
+        
+        for standard_analysis in result.get("standards_analysis", []):
+            name = standard_analysis.get("standard")
+            if name not in standards:
+                standards[name] = dict(standard_analysis)
+                continue
+            # Same standard split across chunks - add it up
+            existing = standards[name]
+            existing["total_issues"] = existing.get("total_issues", 0) + standard_analysis.get("total_issues", 0)
+            for key in ["key_patterns", "recommendations"]:
+                existing[key] = _unique(existing.get(key, []) + standard_analysis.get(key, []))
+            new_level = str(standard_analysis.get("priority_level", "")).lower()
+            if priority_rank.get(new_level, 0) > priority_rank.get(str(existing.get("priority_level", "")).lower(), 0):
+                existing["priority_level"] = standard_analysis["priority_level"]
+        
+        priority_areas.extend(result.get("priority_areas", []))
+        roadmap.extend(result.get("improvement_roadmap", []))
+    
+    return {
+        "summary": {
+            "critical_findings": _unique(critical_findings),
+            "overall_assessment": "\n\n".join(_unique(assessments))
+        },
+        "standards_analysis": list(standards.values()),
+        "priority_areas": sorted(
+            priority_areas,
+            key=lambda area: area.get("priority_score", 0) if isinstance(area.get("priority_score"), (int, float)) else 0,
+            reverse=True
+        ),
+        "improvement_roadmap": sorted(roadmap, key=lambda phase: str(phase.get("phase", "")))
+    }
+
+async def _create_with_retry(messages: List[Dict], max_retries: int = MAX_RETRIES, **kwargs):
+    """
+    Sends one chat request, backing off exponentially when we get rate limited.
+    Extra kwargs go straight through to chat.completions.create.
+    """
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        try:
+            return await get_async_client().chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                **kwargs
+            )
+        except RateLimitError:
+            if attempt == max_retries:
+                raise
+            logger.warning("Rate limited, retrying in %.0fs...", delay)
+            await asyncio.sleep(delay)
+            delay *= 2
+
+@uses_openai_session
+async def run_prompts(
+    prompts: List[str],
+    system_prompt: str,
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_requests_per_minute: Optional[int] = None,
+    response_format: Optional[Dict] = None,
+    return_exceptions: bool = False
+) -> List[str]:
+    """
+    Fires off all the prompts at once (capped by max_concurrency) and
+    returns the raw response text for each, in the same order.
+    max_requests_per_minute spaces out request starts if the account needs it.
+    response_format is passed through to the API (e.g. a JSON schema).
+    With return_exceptions, a failed request shows up as its exception in the
+    results instead of sinking the whole batch.
+    """
+    request_kwargs = {"response_format": response_format} if response_format else {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pace_lock = asyncio.Lock()
+    min_interval = 60.0 / max_requests_per_minute if max_requests_per_minute else 0.0
+    next_start = [0.0]
+    
+    async def run_one(prompt: str) -> str:
+        async with semaphore:
+            if min_interval:
+                # Hand out start times one at a time so we never burst past the limit
+                async with pace_lock:
+                    wait = next_start[0] - time.monotonic()
+                    next_start[0] = max(next_start[0], time.monotonic()) + min_interval
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            completion = await _create_with_retry([
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ], **request_kwargs)
+            return completion.choices[0].message.content
+    
+    return await asyncio.gather(*(run_one(prompt) for prompt in prompts), return_exceptions=return_exceptions)
 
-def analyze_qa_issues(df: pd.DataFrame) -> Dict:
+@uses_openai_session
+async def run_batch_prompts(
+    prompts: List[str],
+    system_prompt: str,
+    response_format: Optional[Dict] = None,
+    poll_interval: float = BATCH_POLL_SECONDS,
+    completion_window: str = "24h"
+) -> List:
+    """
+    Same idea as run_prompts, but submits everything as one OpenAI Batch API job -
+    half the price, but results can take up to completion_window to come back.
+    Waits for the job to finish and returns the response text for each prompt, in order.
+    Requests that failed (or never ran) show up as exceptions, like run_prompts with
+    return_exceptions.
+    """
+    client = get_async_client()
+    
+    # One JSONL line per prompt - custom_id is just the prompt's position
+    lines = []
+    for i, prompt in enumerate(prompts):
+        body = {
+            "model": MODEL,
+            "temperature": TEMPERATURE,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if response_format:
+            body["response_format"] = response_format
+        lines.append(json_utils.dumps_bytes({
+            "custom_id": str(i), "method": "POST", "url": "/v1/chat/completions", "body": body
+        }))
+    
+    batch_file = await client.files.create(file=("batch_requests.jsonl", b"\n".join(lines)), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=completion_window
+    )
+    logger.debug("Submitted batch %s with %d requests", batch.id, len(prompts))
+    
+    while batch.status not in BATCH_DONE_STATUSES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+    logger.debug("Batch %s finished with status %s", batch.id, batch.status)
+    
+    results = [RuntimeError(f"No result for request {i} in batch {batch.id} ({batch.status})") for i in range(len(prompts))]
+    # Expired or cancelled batches can still have output for the requests that did finish
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json_utils.loads(line)
+            response = record.get("response") or {}
+            i = int(record["custom_id"])
+            if record.get("error") or response.get("status_code") != 200:
+                results[i] = RuntimeError(f"Batch request {i} failed: {record.get('error') or response.get('body')}")
+            else:
+                results[i] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+def empty_analysis() -> Dict:
+    """The analysis result for a dataset with no active issues"""
+    return {
+        "summary": {
+            "critical_findings": [],
+            "overall_assessment": "No active issues",
+            "dataset_coverage": {
+                "total_active_issues": 0,
+                "merged_groups": 0,
+                "unmerged_issues": 0,
+                "standards_count": 0
+            }
+        },
+        "standards_analysis": [],
+        "priority_areas": [],
+        "improvement_roadmap": []
+    }
+
+async def analyze_qa_issues_async(
+    df: pd.DataFrame,
+    max_concurrency: int = MAX_CONCURRENCY,
+    max_requests_per_minute: Optional[int] = None,
+    force_refresh: bool = False,
+    chunk_by: Literal["standard", "rowcount"] = "standard",
+    max_rows_per_chunk: int = MAX_ROWS_PER_CHUNK
+) -> Dict:
     """
     Main analysis function - looks through QA data to find patterns and problems.
     Only looks at active stuff (unmerged issues + merged groups) to avoid duplicates.
+    Large datasets are split into chunks (see split_into_chunks) that run in
+    parallel and get merged back together.
+    Results are cached on disk by prompt - pass force_refresh=True to skip the cache.
     """
     try:
+        # Only carry the columns we actually use, then switch them to
+        # Arrow-backed dtypes so the string masking below is cheaper
+        df = normalize_dtypes(df[ANALYSIS_COLUMNS])
+        
         # Filter for active issues - handle NA values explicitly
-        active_issues = df[
-            (df["Merged With Issue ID"].isna()) |  # Unmerged issues
-            (df["Status"].fillna("").str.strip() == "Merged")  # Merged groups for DataFrame operations
-        ].copy()
+        merged_mask_full = get_merged_mask(df)
+        unmerged_mask = df["Merged With Issue ID"].isna()
+        active_mask = unmerged_mask | merged_mask_full  # Unmerged issues + merged groups
+        active_issues = df.loc[active_mask]
         
-        merged_mask = active_issues["Status"].fillna("").str.strip() == "Merged"
-        print(f"Analyzing {len(active_issues)} active issues...")
-        print(f"- Merged Groups: {merged_mask.sum()}")
-        print(f"- Unmerged Issues: {(~merged_mask).sum()}")
+        merged_mask = merged_mask_full[active_mask]
+        logger.info(
+            "Analyzing %d active issues (%d merged groups, %d unmerged)",
+            len(active_issues), merged_mask.sum(), (~merged_mask).sum()
+        )
         
-        # Create and send the analysis prompt
-        prompt = create_analysis_prompt(active_issues)
+        # Nothing to analyze - don't pay for a round trip to find that out
+        if active_issues.empty:
+            return empty_analysis()
         
-        print("[DEBUG] Sending analysis request to LLM...")
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are an expert at analyzing QA testing data for conversational AI systems.
-                    Focus on:
-                    1. Identifying systemic issues and patterns
-                    2. Prioritizing areas for improvement
-                    3. Providing actionable recommendations
-                    4. Suggesting concrete steps for implementation
-                    
-                    Note: The analysis covers only active issues (merged groups and unmerged individuals).
-                    Consider merged groups as representing multiple related issues."""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3
+        # Create the analysis prompts - one per chunk
+        chunks = split_into_chunks(active_issues, merged_mask, chunk_by, max_rows_per_chunk)
+        prompts = [
+            build_chunk_prompt(chunk, chunk_mask, part, len(chunks))
+            for part, (chunk, chunk_mask) in enumerate(chunks, 1)
+        ]
+        
+        # Same data + same settings = same answer, so reuse it if we have one
+        cache_key = make_cache_key(
+            MODEL, TEMPERATURE, ANALYSIS_SYSTEM_PROMPT, json_utils.dumps(ANALYSIS_SCHEMA), *prompts
         )
+        if not force_refresh:
+            cached_results = response_cache.get(cache_key)
+            if cached_results is not None:
+                logger.debug("Using cached analysis results")
+                return cached_results
         
-        # Parse the response
-        response_text = completion.choices[0].message.content
-        print("\n[DEBUG] Raw LLM response:")
-        print(response_text)
+        logger.debug("Sending %d analysis request(s) to LLM...", len(prompts))
+        responses = await run_prompts(
+            prompts,
+            ANALYSIS_SYSTEM_PROMPT,
+            max_concurrency=max_concurrency,
+            max_requests_per_minute=max_requests_per_minute,
+            response_format=ANALYSIS_RESPONSE_FORMAT
+        )
         
-        # Clean up response if it's in markdown format
-        cleaned_response = response_text.strip()
-        if cleaned_response.startswith("```"):
-            cleaned_response = cleaned_response.split("```")[1]
-            if cleaned_response.startswith("json"):
-                cleaned_response = cleaned_response[4:]
-            cleaned_response = cleaned_response.strip()
+        # Parse the responses
+        chunk_results = []
+        for response_text in responses:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Raw LLM response:\n%s", response_text)
+            chunk_results.append(parse_analysis_response(response_text))
+        analysis_results = merge_chunk_results(chunk_results)
+        logger.debug("Successfully parsed analysis results")
         
-        # Parse the JSON response
-        analysis_results = json.loads(cleaned_response)
-        print(f"\n[DEBUG] Successfully parsed analysis results")
+        # The schema no longer carries our counts, so fill them in ourselves
+        analysis_results.setdefault("summary", {})["dataset_coverage"] = {
+            "total_active_issues": len(active_issues),
+            "merged_groups": int(merged_mask.sum()),
+            "unmerged_issues": int((~merged_mask).sum()),
+            "standards_count": active_issues["Linked Standard"].nunique(dropna=False)
+        }
         
+        response_cache.set(cache_key, analysis_results)
         return analysis_results
         
     except Exception as e:
-        print(f"[DEBUG] Error in analysis: {str(e)}")
+        logger.error(f"Error in analysis: {str(e)}")
         raise Exception(f"Failed to analyze QA issues: {str(e)}")
 
-def calculate_priority_score(issue_count: int, avg_score: float, is_merged: bool) -> float:
+def analyze_qa_issues(df: pd.DataFrame, **kwargs) -> Dict:
+    """
+    Sync entry point for the app - runs analyze_qa_issues_async to completion.
+    """
+    return asyncio.run(analyze_qa_issues_async(df, **kwargs))
+
+def calculate_priority_scores(issue_counts: np.ndarray, avg_scores: np.ndarray, is_merged: np.ndarray) -> np.ndarray:
     """
     Figures out how important each issue/standard is (0-100 scale).
+    Works on whole arrays at once so we can score every standard in one shot.
     
     What affects the score:
     - How many issues we found (more = higher priority)
@@ -190,47 +663,66 @@ def calculate_priority_score(issue_count: int, avg_score: float, is_merged: bool
     - Whether we've seen it before (merged issues = probably systemic)
     """
     # Base score from issue count (max 40 points)
-    count_score = min(40, issue_count * 5)
+    count_score = np.minimum(40, np.asarray(issue_counts, dtype=np.float64) * 5)
     
-    # Score from severity (max 40 points)
-    severity_score = min(40, avg_score * 13.33)  # 13.33 * 3 = 40
+    # Score from severity (max 40 points) - fmin so a missing average still caps at 40
+    severity_score = np.fmin(40, np.asarray(avg_scores, dtype=np.float64) * 13.33)  # 13.33 * 3 = 40
     
     # Merge status bonus (20 points)
-    merge_bonus = 20 if is_merged else 0
+    merge_bonus = np.asarray(is_merged, dtype=np.float64) * 20
     
-    return round(count_score + severity_score + merge_bonus, 1)
+    return np.round(count_score + severity_score + merge_bonus, 1)
+
+def calculate_priority_score(issue_count: int, avg_score: float, is_merged: bool) -> float:
+    """
+    Scores a single issue/standard - see calculate_priority_scores for the rules.
+    """
+    return float(calculate_priority_scores(
+        np.array([issue_count]), np.array([avg_score]), np.array([is_merged])
+    )[0])
 
 def generate_priority_areas(df: pd.DataFrame, analysis_results: Dict) -> List[Dict]:
     """
     Takes analysis and raw data to figure out what we need to fix first.
     Spits out a sorted list of problem areas with their priority scores.
     """
-    priority_areas = []
+    if not analysis_results.get("standards_analysis"):
+        return []
     
-    # Process each standard
-    for standard_analysis in analysis_results["standards_analysis"]:
-        standard = standard_analysis["standard"]
-        standard_df = df[df["Linked Standard"] == standard]
-        
-        # Calculate metrics
-        issue_count = len(standard_df)
-        avg_score = standard_df["Final Weighted Score (1-3)"].mean()
-        has_merged = (standard_df["Status"].fillna("").str.strip() == "Merged").any()  # DataFrame operation
-        
-        # Calculate priority score
-        priority_score = calculate_priority_score(issue_count, avg_score, has_merged)
-        
-        # Add to priority areas if score is significant
-        if priority_score > 30:  # Threshold for inclusion
-            priority_areas.append({
-                "standard": standard,
-                "priority_score": priority_score,
-                "issue_count": issue_count,
-                "avg_severity": round(avg_score, 2),
-                "has_merged_issues": has_merged,
-                "key_patterns": standard_analysis.get("key_patterns", []),
-                "recommendations": standard_analysis.get("recommendations", [])
-            })
-    
-    # Sort by priority score descending
-    return sorted(priority_areas, key=lambda x: x["priority_score"], reverse=True)
+    # One groupby pass gets the metrics for every standard at once
+    metrics = df.assign(is_merged=get_merged_mask(df)).groupby("Linked Standard", sort=False, observed=True).agg(
+        issue_count=("Issue ID", "size"),
+        avg_score=("Final Weighted Score (1-3)", "mean"),
+        has_merged=("is_merged", "any")
+    )
+    metrics["avg_score"] = metrics["avg_score"].astype("float64")  # nullable Float64 -> NaN
+    metrics["priority_score"] = calculate_priority_scores(
+        metrics["issue_count"].to_numpy(),
+        metrics["avg_score"].to_numpy(),
+        metrics["has_merged"].to_numpy()
+    )
+    
+    # Keep the standards the model analyzed, skipping any we have no issues for
+    analysis_by_standard = {
+        standard_analysis["standard"]: standard_analysis
+        for standard_analysis in analysis_results["standards_analysis"]
+    }
+    areas = metrics.reindex([standard for standard in analysis_by_standard if standard in metrics.index])
+    
+    # Keep significant scores (threshold for inclusion), sorted by priority score descending
+    areas = areas[areas["priority_score"] > 30].sort_values("priority_score", ascending=False, kind="stable")
+    areas = areas.rename_axis("standard").reset_index().rename(columns={
+        "avg_score": "avg_severity",
+        "has_merged": "has_merged_issues"
+    })
+    areas["standard"] = areas["standard"].astype(object)
+    areas["avg_severity"] = areas["avg_severity"].round(2)
+    
+    # Pull in what the model said about each standard
+    areas["key_patterns"] = [analysis_by_standard[standard].get("key_patterns", []) for standard in areas["standard"]]
+    areas["recommendations"] = [analysis_by_standard[standard].get("recommendations", []) for standard in areas["standard"]]
+    
+    return areas[[
+        "standard", "priority_score", "issue_count", "avg_severity",
+        "has_merged_issues", "key_patterns", "recommendations"
+    ]].to_dict(orient="records")
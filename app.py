@@ -10,26 +10,54 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from dotenv import load_dotenv
 import os
-from llm_utils import analyze_issues_for_merge
-from merge_utils import MergeExecutor
+import io
+import hashlib
+from llm_utils import analyze_issues_for_merge, merge_cache
+from merge_utils import MergeExecutor, normalize_standards
 import plotly.express as px
 from datetime import datetime
-from analysis_utils import analyze_qa_issues, calculate_priority_score, generate_priority_areas
-from report_utils import generate_report
+from analysis_utils import ANALYSIS_COLUMNS, analyze_qa_issues, calculate_priority_score, generate_priority_areas
+from report_utils import generate_report, get_report_issues, render_static_charts
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import queue
 
-# Set up basic logging for debugging
-logging.basicConfig(level=logging.DEBUG)
+# Logging is quiet by default - QA_DEBUG=1 turns on the noisy stuff (or set LOG_LEVEL yourself)
+QA_DEBUG = os.getenv("QA_DEBUG") == "1"
+LOG_LEVEL = "DEBUG" if QA_DEBUG else os.getenv("LOG_LEVEL", "WARNING").upper()
+
+@st.cache_resource
+def setup_logging() -> QueueListener:
+    """
+    Sends log records through a queue so the actual stderr writes happen on a
+    background thread instead of blocking the script. Runs once per server process.
+    """
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    listener = QueueListener(log_queue, stream_handler)
+    
+    root_logger = logging.getLogger()
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(LOG_LEVEL)
+    
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Load config from .env file
 load_dotenv()
 
-# Set up merge helper
-merge_executor = MergeExecutor()
-
 # Set up the page layout - using wide mode for better data visibility
 st.set_page_config(
     page_title="QA Issues Analysis Tool",
@@ -37,20 +65,9 @@ st.set_page_config(
     layout="wide"
 )
 
-# These are the core QA standards that we check against
-QA_STANDARDS = [
-    "Suzy introduces itself clearly, explaining its supportive role in recovery",
-    "Suzy uses accessible, recovery-specific language",
-    "Suzy provides concise, clear responses",
-    "Suzy provides supportive feedback that acknowledges user inputs, especially for personal experiences or achievements",
-    "Suzy offers actionable, non-prescriptive advice for healthcare appointments",
-    "Suzy suggests personalized, relevant community resources",
-    "Suzy sensitively identifies distress cues and responds appropriately",
-    "Suzy encourages users to connect with real-life support networks",
-    "Suzy uses non-judgmental language, avoiding stigmatizing phrases",
-    "Suzy communicates limitations clearly and refrains from giving medical advice",
-    "Suzy offers relevant, supportive educational information when appropriate"
-]
+# Status values a merge can set - their order fixes the category codes
+STATUS_CATEGORIES = ["Merged", "Primary"]
+STATUS_MERGED, STATUS_PRIMARY = 0, 1
 
 # Keep track of app's state between reruns
 if 'df' not in st.session_state:
@@ -61,81 +78,54 @@ if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
 if 'current_tab' not in st.session_state:
     st.session_state.current_tab = 0
+if 'df_version' not in st.session_state:
+    st.session_state.df_version = 0  # Bumped every time df is replaced
 
 # Custom CSS to make the UI look cleaner
-st.markdown("""
-<style>
-    /* File upload area */
-    .stFileUploader {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        background: #f8f9fa;
-        border: 2px dashed #dee2e6;
-    }
-    
-    /* Tab styling */
-    div.row-widget.stRadio > div {
-        flex-direction: row;
-        background: #f8f9fa;
-        border-radius: 0.5rem;
-        padding: 0.5rem;
-    }
-    
-    div.row-widget.stRadio > div label {
-        padding: 0.5rem 1rem;
-        border-radius: 0.3rem;
-        margin-right: 0.5rem;
-    }
-    
-    div.row-widget.stRadio > div [data-baseweb="radio"] {
-        background: white;
-    }
-    
-    /* Section headers */
-    .section-header {
-        margin-top: 2rem;
-        padding-bottom: 1rem;
-        border-bottom: 1px solid #dee2e6;
-    }
-    
-    /* Merge groups */
-    .merge-group {
-        background: #ffffff;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #dee2e6;
-        margin-bottom: 1rem;
-    }
-    
-    .confidence-high {
-        color: #28a745;
-    }
-    
-    .confidence-medium {
-        color: #ffc107;
-    }
-    
-    .confidence-low {
-        color: #dc3545;
-    }
-    
-    /* Cache controls */
-    .cache-controls {
-        background: #f8f9fa;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-    }
-    
-    /* Metrics */
-    .metric-container {
-        background: white;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-    }
-</style>
-""", unsafe_allow_html=True)
+STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "style.css")
+
+@st.cache_data
+def load_css(path: str = STYLE_PATH) -> str:
+    """Reads the stylesheet once per server process instead of rebuilding it every rerun"""
+    with open(path, "r", encoding="utf-8") as f:
+        return f"<style>{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# Columns every upload needs
+REQUIRED_COLUMNS = [
+    "Issue ID", "Result ID", "Test Case IDs", "Input Prompt",
+    "Ground Truth", "Generated Response", "Linked Theme",
+    "Linked Standard", "Session IDs", "Version Tested",
+    "Run Date", "Failure Rationale", "Final Weighted Score (1-3)"
+]
+
+REQUIRED_COLUMN_SET = frozenset(REQUIRED_COLUMNS)
+
+# Suggestions at or above this confidence can be applied all at once
+BULK_MERGE_CONFIDENCE = 0.9
+
+# Merge tracking columns - created if the upload doesn't have them
+MERGE_COLUMNS = ["Status", "Merged With Issue ID", "Merged IDs"]
+
+def as_string_column(column: pd.Series) -> pd.Series:
+    """Converts to Arrow-backed strings, skipping the copy if the column is already a string dtype"""
+    if isinstance(column.dtype, pd.StringDtype):
+        return column
+    return column.astype("string[pyarrow]")
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """
+    Writes the frame out as CSV with Arrow's multithreaded writer.
+    Falls back to pandas for anything Arrow can't convert (mixed-type object columns).
+    """
+    try:
+        buffer = io.BytesIO()
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buffer)
+        return buffer.getvalue()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        logger.debug("Arrow CSV writer failed, using pandas: %s", e)
+        return df.to_csv(index=False).encode('utf-8')
 
 @st.cache_data
 def load_and_validate_data(uploaded_file):
@@ -145,67 +135,191 @@ def load_and_validate_data(uploaded_file):
     Returns the processed dataframe or an error message if something's wrong.
     """
     try:
-        print("[DEBUG] Loading CSV file...")
-        df = pd.read_csv(uploaded_file)
-        print(f"[DEBUG] Loaded {len(df)} rows")
+        # Check the header first so a bad file fails before we parse all of it
+        header = pd.read_csv(uploaded_file, nrows=0)
+        uploaded_file.seek(0)
         
-        # Strip whitespace from column names
-        df.columns = df.columns.str.strip()
-        
-        required_columns = [
-            "Issue ID", "Result ID", "Test Case IDs", "Input Prompt",
-            "Ground Truth", "Generated Response", "Linked Theme",
-            "Linked Standard", "Session IDs", "Version Tested",
-            "Run Date", "Failure Rationale", "Final Weighted Score (1-3)"
-        ]
+        # Strip whitespace from column names once, then it's a single set difference
+        missing = REQUIRED_COLUMN_SET.difference(col.strip() for col in header.columns)
+        if missing:
+            # Report them in the usual column order so the message is stable
+            missing_columns = [col for col in REQUIRED_COLUMNS if col in missing]
+            return None, f"Missing required columns: {', '.join(missing_columns)}"
         
-        # Strip whitespace from required column names for comparison
-        required_columns = [col.strip() for col in required_columns]
-        df_columns = [col.strip() for col in df.columns]
+        logger.debug("Loading CSV file...")
+        # Arrow's multithreaded reader is a lot faster than the default parser on big exports.
+        # Every column is kept - the downloaded CSV has to carry everything the upload had
+        try:
+            df = pd.read_csv(uploaded_file, engine="pyarrow")
+        except pa.ArrowInvalid as e:
+            # Arrow splits the file into blocks on raw newlines, so quoted multi-line cells
+            # (free-text descriptions) can break it on big files - the C parser handles them
+            logger.info("pyarrow couldn't parse the CSV (%s), retrying with the default parser", e)
+            uploaded_file.seek(0)
+            df = pd.read_csv(uploaded_file)
+        logger.debug("Loaded %d rows", len(df))
         
-        missing_columns = [col for col in required_columns if col not in df_columns]
-        if missing_columns:
-            return None, f"Missing required columns: {', '.join(missing_columns)}"
+        # Strip whitespace from column names
+        df.columns = df.columns.str.strip()
         
-        print("[DEBUG] Initializing merge-related columns...")
+        logger.debug("Initializing merge-related columns...")
         # Initialize merge-related columns if they don't exist
         if "Status" not in df.columns:
-            print("[DEBUG] Creating Status column")
+            logger.debug("Creating Status column")
             df["Status"] = pd.NA
         else:
-            print("[DEBUG] Converting existing Status column")
-            # Convert to string type and replace 'Open' with NA
-            df["Status"] = df["Status"].astype("string[python]")
-            df.loc[df["Status"] == "Open", "Status"] = pd.NA
+            logger.debug("Converting existing Status column")
+            # Replace 'Open' with NA - one compare+mask, no string copy since it becomes a categorical below
+            df["Status"] = df["Status"].mask(df["Status"].eq("Open"))
+        
+        # Status as a categorical - Merged/Primary first so their codes are fixed (0/1, NA is -1),
+        # any unexpected values we find are kept after them so they still show up in the warnings
+        extra_statuses = sorted(set(df["Status"].dropna().unique()) - set(STATUS_CATEGORIES))
+        df["Status"] = pd.Categorical(df["Status"], categories=STATUS_CATEGORIES + extra_statuses)
+        
+        # Only a handful of standards, so store each once and compare/group on the codes.
+        # Stripped the same way the merge analysis and validation compare them
+        df["Linked Standard"] = normalize_standards(df["Linked Standard"]).astype("category")
             
         if "Merged With Issue ID" not in df.columns:
-            print("[DEBUG] Creating Merged With Issue ID column")
+            logger.debug("Creating Merged With Issue ID column")
             df["Merged With Issue ID"] = pd.NA
         else:
-            print("[DEBUG] Converting existing Merged With Issue ID column")
-            df["Merged With Issue ID"] = df["Merged With Issue ID"].astype("string[python]")
+            logger.debug("Converting existing Merged With Issue ID column")
+            df["Merged With Issue ID"] = as_string_column(df["Merged With Issue ID"])
             
         if "Merged IDs" not in df.columns:
-            print("[DEBUG] Creating Merged IDs column")
+            logger.debug("Creating Merged IDs column")
             df["Merged IDs"] = pd.NA
         else:
-            print("[DEBUG] Converting existing Merged IDs column")
-            df["Merged IDs"] = df["Merged IDs"].astype("string[python]")
+            logger.debug("Converting existing Merged IDs column")
+            df["Merged IDs"] = as_string_column(df["Merged IDs"])
             
-        # Print column info
-        print("\n[DEBUG] Column Status:")
-        for col in ["Status", "Merged With Issue ID", "Merged IDs"]:
-            null_count = df[col].isna().sum()
-            print(f"[DEBUG] {col}: {null_count} null values out of {len(df)} rows")
+        # Log column info - skipped entirely unless debugging, the null counts scan every row
+        if logger.isEnabledFor(logging.DEBUG):
+            for col in MERGE_COLUMNS:
+                logger.debug("%s: %d null values out of %d rows", col, df[col].isna().sum(), len(df))
             
         return df, None
     except Exception as e:
         return None, f"Error loading file: {str(e)}"
 
-def display_merge_preview(df: pd.DataFrame, merge_suggestion: dict, group_index: int):
+def get_status_codes(df: pd.DataFrame):
+    """
+    Pulls the Status category codes and the merge column null flags out as NumPy arrays,
+    so all the issue counts come from one pass over each column.
+    """
+    status = df["Status"]
+    if not isinstance(status.dtype, pd.CategoricalDtype) or list(status.cat.categories[:2]) != STATUS_CATEGORIES:
+        status = pd.Categorical(status, categories=STATUS_CATEGORIES + sorted(
+            set(status.dropna().unique()) - set(STATUS_CATEGORIES)
+        ))
+    else:
+        status = status.array
+    return status.codes, df["Merged With Issue ID"].isna().to_numpy(), df["Merged IDs"].isna().to_numpy()
+
+def compute_issue_counts(df: pd.DataFrame) -> dict:
+    """
+    Works out every issue count the Overview tab and the report section show,
+    from one set of status codes / null flags.
+    """
+    logger.debug("Calculating metrics for %d rows...", len(df))
+    codes, not_secondary, no_merged_ids = get_status_codes(df)
+    
+    # Validate Status values - anything past Merged/Primary is unexpected
+    invalid = codes > STATUS_PRIMARY
+    invalid_count = int(invalid.sum())
+    if invalid_count > 0:
+        logger.warning(
+            "Found %d invalid Status values:\n%s",
+            invalid_count, df["Status"][invalid].value_counts()
+        )
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Status value counts:\n%s", df["Status"].value_counts(dropna=False))
+    
+    # One pass for the per-status counts (NA is code -1, so shift everything up by one)
+    status_counts = np.bincount(codes + 1, minlength=STATUS_PRIMARY + 2)
+    merged_count = int(status_counts[STATUS_MERGED + 1])
+    status_na = codes == -1
+    counts = {
+        "total": len(df),
+        # Not marked as merged (Overview tab)
+        "not_merged": len(df) - merged_count,
+        # Not merged, not a primary issue, and not a secondary issue
+        "active": int(((status_na | invalid) & not_secondary).sum()),
+        "merged_groups": merged_count,
+        # Not part of any merge group (either as primary or secondary)
+        "unmerged": int((status_na & not_secondary & no_merged_ids).sum())
+    }
+    logger.debug("Issue counts: %s", counts)
+    return counts
+
+def get_issue_counts(df: pd.DataFrame) -> dict:
+    """
+    Returns compute_issue_counts(df), reusing the last result until df is replaced
+    (tracked by session_state.df_version) so plain widget reruns skip the scans.
+    """
+    df_version = st.session_state.df_version
+    cached_counts = st.session_state.get("_issue_counts")
+    if cached_counts is None or cached_counts[0] != df_version:
+        cached_counts = (df_version, compute_issue_counts(df))
+        st.session_state._issue_counts = cached_counts
+    return cached_counts[1]
+
+# Everything the report analysis reads - if none of it changed, neither did the answer
+FINGERPRINT_COLUMNS = ANALYSIS_COLUMNS
+
+@st.cache_resource
+def get_merge_executor() -> MergeExecutor:
+    """One merge helper shared by every rerun and session, instead of a new one per script run"""
+    return MergeExecutor()
+
+# How many merges the History tab shows at a time
+HISTORY_PAGE_SIZE = 50
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_merge_history(_auditor, audit_file: str, modified_at, offset: int = 0) -> tuple:
+    """
+    Reads one page of the merge audit log, newest first, as (entries, total).
+    audit_file and modified_at are only here for the cache key, so we only
+    re-read the log after it's been written to (or deleted).
+    """
+    return _auditor.get_merge_history_page(limit=HISTORY_PAGE_SIZE, offset=offset)
+
+def _df_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Hashes just the columns the analyses read, so Streamlit doesn't have to
+    pickle and hash the whole frame on every rerun.
+    """
+    columns = [col for col in FINGERPRINT_COLUMNS if col in df.columns]
+    return hashlib.blake2b(
+        pd.util.hash_pandas_object(df[columns], index=False).values.tobytes()
+    ).hexdigest()
+
+@st.cache_data(ttl=3600, max_entries=8, show_spinner=False, hash_funcs={pd.DataFrame: _df_fingerprint})
+def cached_analyze_qa_issues(df: pd.DataFrame, _force_refresh: bool = False) -> dict:
+    """
+    Runs the report analysis once per version of the data.
+    _force_refresh skips the on-disk prompt cache too (leading underscore keeps it out of the cache key).
+    """
+    return analyze_qa_issues(df, force_refresh=_force_refresh)
+
+def get_indexed_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df indexed by Issue ID (first row wins on duplicates) for hashed lookups.
+    Built once per version of the data and kept in session state.
+    """
+    if st.session_state.get("_idx_source") is not df:
+        st.session_state._idx_df = df.drop_duplicates("Issue ID").set_index("Issue ID", drop=False)
+        st.session_state._idx_source = df
+    return st.session_state._idx_df
+
+def display_merge_preview(idx_df: pd.DataFrame, merge_suggestion: dict, group_index: int):
     """
     Shows a detailed view of issues that could be merged together.
     Lets the user pick which secondary issues to include in the merge.
+    idx_df is the data indexed by Issue ID (see get_indexed_df).
     """
     issues = merge_suggestion["issues"]
     primary_issue = issues[0]
@@ -215,7 +329,7 @@ def display_merge_preview(df: pd.DataFrame, merge_suggestion: dict, group_index:
     
     # Display primary issue
     st.write("**Primary Issue**")
-    primary_data = df[df["Issue ID"] == primary_issue].iloc[0]
+    primary_data = idx_df.loc[primary_issue]
     st.info(f"""
     **ID**: {primary_issue}
     **Input**: {primary_data['Input Prompt']}
@@ -224,48 +338,25 @@ def display_merge_preview(df: pd.DataFrame, merge_suggestion: dict, group_index:
     **Rationale**: {primary_data['Failure Rationale']}
     """)
     
-    # Initialize selected issues in session state if not present
-    if "selected_issues" not in st.session_state:
-        st.session_state.selected_issues = {}
-    
-    # Create a unique key for this merge group
-    group_key = f"group_{group_index}"
-    if group_key not in st.session_state.selected_issues:
-        st.session_state.selected_issues[group_key] = {}
-    
-    # Display secondary issues with checkboxes
+    # Display secondary issues - one multiselect picks which ones go in, instead of a checkbox each
     st.write("**Issues to be Merged**")
-    selected_secondary = []
+    included = set(st.multiselect(
+        "Include",
+        secondary_issues,
+        default=secondary_issues,
+        key=f"sel_{group_index}"
+    ))
+    selected_secondary = [issue_id for issue_id in secondary_issues if issue_id in included]
     
     # Display each secondary issue
     for issue_id in secondary_issues:
-        # Create two columns - one for checkbox, one for content
-        col1, col2 = st.columns([1, 4])
-        
-        with col1:
-            # Initialize checkbox state for this issue if not present
-            if issue_id not in st.session_state.selected_issues[group_key]:
-                st.session_state.selected_issues[group_key][issue_id] = True
-                
-            # Create a checkbox for this issue with a unique key
-            is_selected = st.checkbox(
-                "Include",
-                value=st.session_state.selected_issues[group_key][issue_id],
-                key=f"checkbox_{group_index}_{issue_id}"
-            )
-            st.session_state.selected_issues[group_key][issue_id] = is_selected
-            
-        with col2:
-            issue_data = df[df["Issue ID"] == issue_id].iloc[0]
-            st.markdown(f"""
-            **Issue {issue_id}**
-            - **Input**: {issue_data['Input Prompt']}
-            - **Score**: {issue_data['Final Weighted Score (1-3)']}
-            - **Rationale**: {issue_data['Failure Rationale']}
-            """)
-            
-        if is_selected:
-            selected_secondary.append(issue_id)
+        issue_data = idx_df.loc[issue_id]
+        st.markdown(f"""
+        **Issue {issue_id}**
+        - **Input**: {issue_data['Input Prompt']}
+        - **Score**: {issue_data['Final Weighted Score (1-3)']}
+        - **Rationale**: {issue_data['Failure Rationale']}
+        """)
             
         # Add a divider between issues
         st.divider()
@@ -286,6 +377,106 @@ def display_merge_preview(df: pd.DataFrame, merge_suggestion: dict, group_index:
     **Rationale**: {merge_suggestion['rationale']}
     """)
 
+def get_confidence_classes(suggestions: list) -> list:
+    """
+    Buckets every suggestion's confidence into its CSS class in one go.
+    Worked out once per suggestion list and kept in session state.
+    """
+    if st.session_state.get("_merge_classes_for") is not suggestions:
+        confidences = np.array([s['confidence'] for s in suggestions], dtype=float)
+        st.session_state.merge_classes = np.where(
+            confidences >= 0.9, 'confidence-high',
+            np.where(confidences >= 0.7, 'confidence-medium', 'confidence-low')
+        ).tolist()
+        st.session_state._merge_classes_for = suggestions
+    return st.session_state.merge_classes
+
+def render_apply_all(df: pd.DataFrame, merge_executor: MergeExecutor):
+    """One button that applies every high-confidence suggestion in a single pass"""
+    high_confidence = [
+        s for s in st.session_state.merge_suggestions
+        if s['confidence'] >= BULK_MERGE_CONFIDENCE
+    ]
+    if not high_confidence:
+        return
+    
+    if st.button(f"✅ Apply All {len(high_confidence)} Merges (Confidence ≥ {BULK_MERGE_CONFIDENCE})"):
+        with st.spinner("Applying merges..."):
+            updated_df, merge_actions = merge_executor.execute_merges(df, high_confidence)
+        
+        if not merge_actions:
+            st.error("Merge validation failed for every group. Please check the issues and try again.")
+            return
+        if len(merge_actions) < len(high_confidence):
+            logger.warning("Skipped %d merge group(s) that failed validation", len(high_confidence) - len(merge_actions))
+        
+        st.session_state.df = updated_df
+        st.session_state.df_version += 1
+        # Drop the suggestions that went through - each applied merge has its own primary issue
+        applied_primaries = {action["primary_issue"] for action in merge_actions}
+        st.session_state.merge_suggestions = [
+            s for s in st.session_state.merge_suggestions
+            if s.get("selected_issues", s["issues"])[0] not in applied_primaries
+        ]
+        st.rerun()
+
+def render_merge_group(
+    df: pd.DataFrame,
+    idx_df: pd.DataFrame,
+    suggestion: dict,
+    group_index: int,
+    confidence_class: str,
+    merge_executor: MergeExecutor
+):
+    """
+    Draws one merge suggestion with its Apply button. The preview checkboxes live in a
+    form, so ticking them doesn't rerun the whole script - only Apply Merge does.
+    """
+    confidence = suggestion['confidence']
+    
+    st.markdown(f'''
+    <div class="merge-group">
+        <h3>Merge Group {group_index} <span class="{confidence_class}">
+        (Confidence: {confidence:.2f})</span></h3>
+    </div>
+    ''', unsafe_allow_html=True)
+    
+    with st.form(key=f"merge_form_{group_index}", border=False):
+        display_merge_preview(idx_df, suggestion, group_index)
+        
+        # Add merge button for this group
+        apply_merge = st.form_submit_button(f"Apply Merge {group_index}")
+    
+    if apply_merge:
+        with st.spinner("Applying merge..."):
+            updated_df, merge_action = merge_executor.execute_merge(df, suggestion)
+                
+            if merge_action:
+                st.success("Merge completed successfully!")
+                # Update the DataFrame in session state
+                st.session_state.df = updated_df
+                st.session_state.df_version += 1
+                # Remove the applied suggestion - identity check, no need to compare dicts field by field.
+                # Builds a new list rather than popping so the confidence classes get recomputed
+                st.session_state.merge_suggestions = [
+                    s for s in st.session_state.merge_suggestions 
+                    if s is not suggestion
+                ]
+                    
+                # Allow downloading the updated CSV
+                st.download_button(
+                    "Download Updated CSV",
+                    to_csv_bytes(updated_df),
+                    "merged_issues.csv",
+                    "text/csv",
+                    key=f'download-csv-{group_index}'
+                )
+                    
+                # Force a rerun to update the UI
+                st.rerun()
+            else:
+                st.error("Merge validation failed. Please check the issues and try again.")
+
 def analyze_issues():
     try:
         # Load and preprocess data
@@ -294,49 +485,10 @@ def analyze_issues():
             st.error("No data available for analysis. Please check the data files.")
             return
 
-        print("\n[DEBUG] Calculating metrics...")
-        print(f"[DEBUG] Total rows in DataFrame: {len(df)}")
-        
-        # Validate Status values
-        valid_status_values = {"Merged", "Primary"}
-        invalid_status = df[~pd.isna(df["Status"]) & ~df["Status"].isin(valid_status_values)]
-        if len(invalid_status) > 0:
-            print("[WARNING] Found invalid Status values:")
-            print(invalid_status["Status"].value_counts())
-            
-        # Calculate active issues (not merged and not a primary issue)
-        active_mask = (
-            (pd.isna(df["Status"]) | ~df["Status"].isin(["Merged", "Primary"])) &  # Not merged or primary
-            pd.isna(df["Merged With Issue ID"])  # Not a secondary issue
-        )
-        active_count = active_mask.sum()
-        print(f"[DEBUG] Active issues count: {active_count}")
-        print("[DEBUG] Active issues breakdown:")
-        print("- Status is NA:", pd.isna(df["Status"]).sum())
-        print("- Status not in [Merged, Primary]:", (~df["Status"].isin(["Merged", "Primary"])).sum())
-        print("- Not a secondary issue:", pd.isna(df["Merged With Issue ID"]).sum())
-        
-        print("\n[DEBUG] Status value counts:")
-        print(df["Status"].value_counts(dropna=False))
-        
-        # Calculate merged groups
-        merged_groups = len(df[df["Status"] == "Merged"])
-        print(f"[DEBUG] Merged groups (Status is 'Merged'): {merged_groups}")
-        
-        # Calculate unmerged issues
-        unmerged_mask = (
-            pd.isna(df["Status"]) & 
-            pd.isna(df["Merged With Issue ID"]) & 
-            pd.isna(df["Merged IDs"])
-        )
-        unmerged_count = unmerged_mask.sum()
-        print(f"[DEBUG] Unmerged issues: {unmerged_count}")
-        
-        # Debug merge-related columns
-        print("[DEBUG] Merge-related columns status:")
-        print(f"Status NA count: {pd.isna(df['Status']).sum()}")
-        print(f"Merged With Issue ID NA count: {pd.isna(df['Merged With Issue ID']).sum()}")
-        print(f"Merged IDs NA count: {pd.isna(df['Merged IDs']).sum()}")
+        counts = get_issue_counts(df)
+        active_count = counts["active"]
+        merged_groups = counts["merged_groups"]
+        unmerged_count = counts["unmerged"]
         
         # Display issue counts
         col1, col2, col3 = st.columns(3)
@@ -348,50 +500,52 @@ def analyze_issues():
         with col3:
             st.metric("Unmerged Issues", unmerged_count)
         
+        regenerate = st.checkbox(
+            "🔄 Regenerate analysis",
+            value=False,
+            help="Ignore saved analysis results and ask GPT-4o again"
+        )
+        
         if st.button("Generate Analysis Report", type="primary"):
+            if regenerate:
+                cached_analyze_qa_issues.clear()
+            
             with st.spinner("Analyzing issues and generating report..."):
+                report_buffer = io.BytesIO()
                 try:
-                    # Perform analysis
-                    analysis_results = analyze_qa_issues(df)
-                    
-                    # Generate report
-                    report_path = generate_report(df, analysis_results)
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        # The data-only charts don't need the analysis, so draw them while it runs
+                        static_charts = executor.submit(render_static_charts, get_report_issues(df))
+                        
+                        # Perform analysis
+                        analysis_results = cached_analyze_qa_issues(df, _force_refresh=regenerate)
+                        prerendered = static_charts.result()
                     
-                    # Read the PDF file
-                    with open(report_path, "rb") as pdf_file:
-                        pdf_bytes = pdf_file.read()
+                    # Generate report straight into memory - no need to write it out and read it back
+                    generate_report(df, analysis_results, out=report_buffer, prerendered=prerendered)
                     
                     # Create download button
                     st.success("✅ Report generated successfully!")
                     st.download_button(
                         label="📥 Download Analysis Report (PDF)",
-                        data=pdf_bytes,
+                        data=report_buffer.getvalue(),
                         file_name="qa_analysis_report.pdf",
                         mime="application/pdf",
                         key="download_report"
                     )
                     
                 except Exception as e:
-                    logger.error(f"Error in report generation: {str(e)}")
-                    st.warning("The report was generated but some visualizations may be missing. This can happen due to temporary system limitations. The report still contains all analysis text and available charts.")
-                    
-                    # Try to provide download even if there were some issues
-                    if os.path.exists("qa_analysis_report.pdf"):
-                        with open("qa_analysis_report.pdf", "rb") as pdf_file:
-                            pdf_bytes = pdf_file.read()
-                        st.download_button(
-                            label="📥 Download Analysis Report (PDF)",
-                            data=pdf_bytes,
-                            file_name="qa_analysis_report.pdf",
-                            mime="application/pdf",
-                            key="download_report_fallback"
-                        )
+                    # The PDF only lands in the buffer once it's complete, so there's no partial report to offer
+                    logger.error(f"Error in report generation: {str(e)}", exc_info=True)
+                    st.error(f"Couldn't generate the report: {str(e)}")
 
     except Exception as e:
         st.error(f"An error occurred during analysis: {str(e)}")
         logger.error(f"Error in analyze_issues: {str(e)}", exc_info=True)
 
 def main():
+    merge_executor = get_merge_executor()
+    
     st.title("QA Issues Analysis Tool")
     st.markdown("""
     This tool helps analyze and process QA testing issues for chatbot responses.
@@ -411,6 +565,7 @@ def main():
                 st.error(error)
                 return
             st.session_state.df = df
+            st.session_state.df_version += 1
             st.success("File loaded successfully!")
         
         df = st.session_state.df
@@ -424,27 +579,21 @@ def main():
         if st.session_state.current_tab == 0:  # Overview tab
             st.markdown('<h2 class="section-header">Data Summary</h2>', unsafe_allow_html=True)
             
-            # Metrics in a grid with custom styling
+            counts = get_issue_counts(df)
+            
+            # Metrics in a grid - bordered containers are drawn by the frontend,
+            # so there's no extra HTML to send around each metric
             col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown('<div class="metric-container">', unsafe_allow_html=True)
-                total_issues = len(df)
-                st.metric("Total Issues", total_issues)
-                st.markdown('</div>', unsafe_allow_html=True)
+            with col1.container(border=True):
+                st.metric("Total Issues", counts["total"])
             
-            with col2:
-                st.markdown('<div class="metric-container">', unsafe_allow_html=True)
+            with col2.container(border=True):
                 # Active issues are those not marked as merged
-                active_issues = len(df[pd.isna(df["Status"]) | (df["Status"] != "Merged")])
-                st.metric("Active Issues", active_issues)
-                st.markdown('</div>', unsafe_allow_html=True)
+                st.metric("Active Issues", counts["not_merged"])
             
-            with col3:
-                st.markdown('<div class="metric-container">', unsafe_allow_html=True)
+            with col3.container(border=True):
                 # Unmerged issues are those not part of any merge group (either as primary or secondary)
-                unmerged_issues = len(df[pd.isna(df["Status"]) & pd.isna(df["Merged With Issue ID"]) & pd.isna(df["Merged IDs"])])
-                st.metric("Unmerged Issues", unmerged_issues)
-                st.markdown('</div>', unsafe_allow_html=True)
+                st.metric("Unmerged Issues", counts["unmerged"])
             
             # Charts with consistent styling...
             
@@ -459,8 +608,11 @@ def main():
             with cache_col2:
                 if st.button("🗑️ Clear Cache", type="secondary"):
                     try:
-                        if os.path.exists(merge_executor.auditor.audit_file):
-                            os.remove(merge_executor.auditor.audit_file)
+                        # Saved merge suggestions go too, so the next analysis asks GPT-4o again
+                        cleared_suggestions = merge_cache.clear()
+                        # Goes through the auditor so its open log handle gets closed first
+                        cleared_history = merge_executor.auditor.clear_cache()
+                        if cleared_history or cleared_suggestions:
                             st.success("Cache cleared successfully!")
                         else:
                             st.info("No cache file found.")
@@ -471,66 +623,50 @@ def main():
             # Analyze button with prominence
             if st.button("🔍 Analyze Issues", type="primary"):
                 with st.spinner("Analyzing issues for potential merges..."):
-                    st.session_state.merge_suggestions = analyze_issues_for_merge(df)
+                    try:
+                        # No st.cache_data here - merge_cache already keeps each standard's groups,
+                        # and a standard that failed has to be asked again on the next click
+                        st.session_state.merge_suggestions = analyze_issues_for_merge(df)
+                    except Exception as e:
+                        logger.error(f"Error in merge analysis: {str(e)}", exc_info=True)
+                        st.error(f"Error analyzing issues: {str(e)}")
             
             # Display merge suggestions with enhanced styling
             if st.session_state.merge_suggestions:
+                idx_df = get_indexed_df(df)
+                confidence_classes = get_confidence_classes(st.session_state.merge_suggestions)
+                render_apply_all(df, merge_executor)
                 for i, suggestion in enumerate(st.session_state.merge_suggestions, 1):
-                    confidence = suggestion['confidence']
-                    confidence_class = (
-                        'confidence-high' if confidence >= 0.9
-                        else 'confidence-medium' if confidence >= 0.7
-                        else 'confidence-low'
-                    )
-                    
-                    st.markdown(f'''
-                    <div class="merge-group">
-                        <h3>Merge Group {i} <span class="{confidence_class}">
-                        (Confidence: {confidence:.2f})</span></h3>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                    
-                    display_merge_preview(df, suggestion, i)
-                        
-                    # Add merge button for this group
-                    if st.button(f"Apply Merge {i}", key=f"merge_{i}"):
-                        with st.spinner("Applying merge..."):
-                            updated_df, merge_action = merge_executor.execute_merge(df, suggestion)
-                                
-                            if merge_action:
-                                st.success("Merge completed successfully!")
-                                # Update the DataFrame in session state
-                                st.session_state.df = updated_df
-                                # Remove the applied suggestion
-                                st.session_state.merge_suggestions = [
-                                    s for s in st.session_state.merge_suggestions 
-                                    if s != suggestion
-                                ]
-                                    
-                                # Allow downloading the updated CSV
-                                st.download_button(
-                                    "Download Updated CSV",
-                                    updated_df.to_csv(index=False).encode('utf-8'),
-                                    "merged_issues.csv",
-                                    "text/csv",
-                                    key=f'download-csv-{i}'
-                                )
-                                    
-                                # Force a rerun to update the UI
-                                st.rerun()
-                            else:
-                                st.error("Merge validation failed. Please check the issues and try again.")
+                    render_merge_group(df, idx_df, suggestion, i, confidence_classes[i - 1], merge_executor)
         
         elif st.session_state.current_tab == 2:  # Merge History tab
             st.markdown('<h2 class="section-header">Merge History</h2>', unsafe_allow_html=True)
             
-            # Load and display merge history
+            # Load and display merge history - one page at a time, newest first
             auditor = merge_executor.auditor
-            history = auditor.get_merge_history()
+            modified_at = os.path.getmtime(auditor.audit_file) if os.path.exists(auditor.audit_file) else None
+            history_offset = st.session_state.get("history_offset", 0)
+            history, history_total = load_merge_history(auditor, auditor.audit_file, modified_at, history_offset)
             
             if not history:
+                if history_offset:
+                    # Log shrank under us (e.g. cleared) - go back to the newest page
+                    st.session_state.history_offset = 0
+                    st.rerun()
                 st.info("No merge history available yet.")
                 return
+            
+            shown_up_to = history_offset + len(history)
+            st.caption(f"Showing merges {history_offset + 1}-{shown_up_to} of {history_total} (newest first)")
+            nav_col1, nav_col2 = st.columns(2)
+            with nav_col1:
+                if history_offset > 0 and st.button("⬅️ Show newer"):
+                    st.session_state.history_offset = max(history_offset - HISTORY_PAGE_SIZE, 0)
+                    st.rerun()
+            with nav_col2:
+                if shown_up_to < history_total and st.button("Show older ➡️"):
+                    st.session_state.history_offset = shown_up_to
+                    st.rerun()
                 
             for entry in history:
                 # Get the number of secondary issues
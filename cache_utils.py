@@ -0,0 +1,69 @@
+"""
+# Response cache for SUDCare QA
+#
+# Simple on-disk cache for LLM results so re-running an analysis on
+# the same data doesn't pay for the same GPT-4o call twice.
+"""
+
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import shutil
+import time
+
+# Where cached responses live - one JSON file per request
+CACHE_DIR = os.getenv("QA_CACHE_DIR", ".openai_cache")
+
+# Cached responses go stale after a week
+DEFAULT_TTL = 7 * 86400
+
+def make_cache_key(*parts: Any) -> str:
+    """
+    Builds a stable key from everything that affects the model's answer
+    (model, temperature, prompts...).
+    """
+    return hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Keeps parsed LLM responses on disk, keyed by prompt hash"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl: Optional[float] = DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if we don't have a fresh one"""
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores a value - writes to a temp file first so readers never see half a file"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def clear(self) -> bool:
+        """Wipes out every cached response"""
+        try:
+            if os.path.exists(self.cache_dir):
+                shutil.rmtree(self.cache_dir)
+                return True
+            return False
+        except Exception:
+            return False
+
+# What other files can import
+__all__ = ['make_cache_key', 'ResponseCache', 'CACHE_DIR', 'DEFAULT_TTL']
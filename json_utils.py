@@ -0,0 +1,47 @@
+"""
+# JSON helpers for SUDCare QA
+#
+# Thin wrapper so the big prompt payloads and LLM replies go through
+# orjson when it's installed, and plain json when it isn't.
+"""
+
+from typing import Any, Union
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - stdlib json works, just slower
+    orjson = None
+
+def _default(value: Any) -> Any:
+    """Handles numpy scalars that slip through from pandas"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """Serializes to a JSON string - compact, or with a 2-space indent if asked"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(value, default=_default, option=option).decode("utf-8")
+    if indent:
+        return json.dumps(value, indent=2, ensure_ascii=False, default=_default)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+def dumps_bytes(value: Any) -> bytes:
+    """Serializes to compact UTF-8 JSON bytes - handy for building big payloads piece by piece"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parses a JSON string or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# orjson raises its own error type, but it subclasses this one
+JSONDecodeError = json.JSONDecodeError
+
+# What other files can import
+__all__ = ['dumps', 'dumps_bytes', 'loads', 'JSONDecodeError']
@@ -7,187 +7,438 @@
 # Main focus is on finding similar issues we can merge to reduce duplicates.
 """
 
-from openai import OpenAI
+import asyncio
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Tuple
-import json
+from functools import lru_cache
+import logging
 import os
 from dotenv import load_dotenv
+from analysis_utils import MODEL, TEMPERATURE, run_batch_prompts, run_prompts
+from cache_utils import CACHE_DIR, ResponseCache, make_cache_key
+from merge_utils import copy_for_merge, normalize_standards
+import json_utils
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional - without it every issue goes to the LLM like before
+    SentenceTransformer = None
+
+logger = logging.getLogger(__name__)
 
 # Load config from .env
 load_dotenv()
 
-# Need this for the OpenAI API
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+# Fields each issue sends to the model, in the order the issue dicts are built from
+MERGE_ISSUE_COLUMNS = ["Issue ID", "Input Prompt", "Failure Rationale", "Linked Standard", "Final Weighted Score (1-3)"]
+
+# Merge groups from earlier runs, one entry per standard - kept apart from the report
+# analysis cache so the Clear Cache button on the merge tab only drops these
+merge_cache = ResponseCache(os.path.join(CACHE_DIR, "merge"))
+
+# Long prompts/rationales get cut to this many characters before they go to the model
+MAX_FIELD_CHARS = int(os.getenv("MERGE_MAX_FIELD_CHARS", "500"))
+
+# Request sizes, in (estimated) tokens of issue data. No request goes over MAX_REQUEST_TOKENS -
+# bigger standards get split. Standards of LARGE_STANDARD_TOKENS or more get a request to
+# themselves; smaller ones are batched together up to MAX_REQUEST_TOKENS per request
+MAX_REQUEST_TOKENS = int(os.getenv("MERGE_MAX_REQUEST_TOKENS", "15000"))
+LARGE_STANDARD_TOKENS = 6000
+
+# Rough rule of thumb for English text - close enough for sizing requests
+CHARS_PER_TOKEN = 4
+
+# JSON schema for the merge reply - merge groups segmented by standard, each tagged with the
+# standard_id it was sent with (not the name, which the model might not echo back exactly).
+# The API guarantees the output matches it
+_MERGE_GROUP_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "issues": {"type": "array", "items": {"type": "string"}},
+        "rationale": {"type": "string"},
+        "confidence": {"type": "number"}
+    },
+    "required": ["issues", "rationale", "confidence"],
+    "additionalProperties": False
+}
+MERGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {"type": "array", "items": {
+            "type": "object",
+            "properties": {
+                "standard_id": {"type": "integer"},
+                "merge_groups": {"type": "array", "items": _MERGE_GROUP_SCHEMA}
+            },
+            "required": ["standard_id", "merge_groups"],
+            "additionalProperties": False
+        }}
+    },
+    "required": ["results"],
+    "additionalProperties": False
+}
+MERGE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "merge_suggestions", "schema": MERGE_SCHEMA, "strict": True}
+}
+
+# Same for every standard, so it goes in the system message where OpenAI can cache it
+MERGE_SYSTEM_PROMPT = """You are an expert at analyzing QA issues and identifying patterns and similarities between issues.
+                        When analyzing issues:
+                        1. Look for similar root causes or overlapping problems
+                        2. Issues with similar themes or patterns should be merged
+                        3. Consider all possible relationships between issues
+                        4. Group related issues together - don't split them across multiple suggestions
+                        5. Only suggest merges when there is strong similarity (confidence >= 0.8)
+                        6. You can suggest multiple issues be merged together if they are all related
+                        7. Long input prompts and failure rationales are cut short (ending in "…") - judge on what's there"""
+
+# Local embedding pre-filter for merge analysis (only used if sentence-transformers is installed)
+EMBEDDING_MODEL = os.getenv("MERGE_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+SIMILARITY_THRESHOLD = float(os.getenv("MERGE_SIMILARITY_THRESHOLD", "0.82"))
+
+def truncate_text(value, limit: int = MAX_FIELD_CHARS):
+    """Cuts long text down to limit characters, marking the cut with an ellipsis. Non-strings pass through"""
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + "…"
+    return value
 
-print(f"[DEBUG] Using API key starting with: {api_key[:10]}...")
+@lru_cache(maxsize=1)
+def get_encoder():
+    """Loads the embedding model once per process"""
+    return SentenceTransformer(EMBEDDING_MODEL)
 
-# Set up OpenAI connection
-client = OpenAI(
-    api_key=api_key,
-    base_url="https://api.openai.com/v1"  # Explicitly set base URL
-)
+def filter_merge_candidates(issues: List[Dict], threshold: float = SIMILARITY_THRESHOLD) -> List[Dict]:
+    """
+    Drops issues that aren't similar enough to any other issue to be worth asking the LLM about.
+    Embeds prompt + rationale for the whole batch at once and keeps every issue with at least
+    one neighbour above the cosine threshold. Returns the issues unchanged if the model isn't available.
+    """
+    if SentenceTransformer is None or len(issues) < 2:
+        return issues
+    
+    texts = [
+        " ".join(str(issue[field]) for field in ("input_prompt", "failure_rationale") if pd.notna(issue[field]))
+        for issue in issues
+    ]
+    try:
+        embeddings = get_encoder().encode(texts, batch_size=64, normalize_embeddings=True)
+    except Exception as e:
+        logger.warning(f"Embedding pre-filter failed, sending all issues: {str(e)}")
+        return issues
+    
+    # Normalized embeddings, so the dot product is the cosine similarity
+    similarity = embeddings @ embeddings.T
+    np.fill_diagonal(similarity, -1.0)
+    has_neighbour = (similarity > threshold).any(axis=1)
+    
+    logger.debug("Embedding pre-filter kept %d of %d issues", int(has_neighbour.sum()), len(issues))
+    return [issue for issue, keep in zip(issues, has_neighbour) if keep]
 
-def create_merge_analysis_prompt(issues: List[Dict]) -> str:
+def make_merge_cache_key(standard: str, issues: List[Dict]) -> str:
+    """
+    Key for one standard's merge groups - the same issues (in any order) under the
+    same standard and model settings get the same answer, so it only depends on those.
+    """
+    return make_cache_key(
+        MODEL, TEMPERATURE, MERGE_SYSTEM_PROMPT, json_utils.dumps(MERGE_SCHEMA), standard,
+        json_utils.dumps(sorted(issues, key=lambda issue: str(issue["issue_id"])))
+    )
+
+def create_merge_analysis_prompt(batch: List[Tuple[str, List[Dict]]]) -> str:
     """
     Builds a prompt for GPT-4o to help find issues we should merge.
-    Formats data in a way that makes it easy for the model to analyze.
+    Takes (standard, issues) pairs - one standard, or several small ones batched together -
+    and formats them in a way that makes it easy for the model to analyze.
     """
+    payload = {
+        "per_standard": [
+            {"standard_id": standard_id, "standard": standard, "issues": issues}
+            for standard_id, (standard, issues) in enumerate(batch)
+        ]
+    }
     return f"""Analyze the following QA issues and identify which ones should be merged based on similar root causes or overlapping problems.
+Issues are grouped by standard - only merge issues within the same standard, never across standards.
 For each potential merge, explain the rationale and provide a confidence score (0-1).
 
 Issues to analyze:
-{json.dumps(issues, indent=2)}
-
-Provide your response in the following JSON format:
-{{
-    "merge_groups": [
-        {{
-            "issues": ["issue_id1", "issue_id2"],
-            "rationale": "Explanation for why these should be merged",
-            "confidence": 0.95
-        }}
-    ]
-}}"""
+{json_utils.dumps(payload)}
+
+Return one entry in "results" per standard above, with its standard_id and its merge groups (an empty list if nothing should be merged)."""
 
-def analyze_issues_for_merge(df: pd.DataFrame) -> List[Dict]:
+def estimate_tokens(value) -> int:
+    """Rough token count for a value once it's serialized into the prompt"""
+    return len(json_utils.dumps(value)) // CHARS_PER_TOKEN + 1
+
+def split_standard(issues: List[Dict], sizes: List[int], max_tokens: int) -> List[List[Dict]]:
+    """
+    Splits one standard's issues into pieces under max_tokens each - biggest issues
+    first, each into the first piece with room, so the pieces come out evenly packed.
+    """
+    pieces = []  # [tokens used, issues]
+    for i in sorted(range(len(issues)), key=sizes.__getitem__, reverse=True):
+        for piece in pieces:
+            if piece[0] + sizes[i] <= max_tokens:
+                piece[0] += sizes[i]
+                piece[1].append(issues[i])
+                break
+        else:
+            pieces.append([sizes[i], [issues[i]]])
+    return [piece_issues for _, piece_issues in pieces]
+
+def batch_merge_requests(
+    tasks: List[Tuple[str, List[Dict]]],
+    max_tokens: int = MAX_REQUEST_TOKENS
+) -> List[List[Tuple[str, List[Dict]]]]:
+    """
+    Groups per-standard tasks into requests, sized by estimated tokens rather than issue
+    count so long issues don't blow the context and short ones don't waste round trips.
+    Big standards get a request to themselves (split into pieces if they'd go over max_tokens),
+    small ones are packed together so they share one round trip and one copy of the system prompt.
+    """
+    batches = []
+    small_batch, small_batch_tokens = [], 0
+    for standard, issues in tasks:
+        sizes = [estimate_tokens(issue) for issue in issues]
+        tokens = sum(sizes)
+        if tokens > max_tokens:
+            logger.debug("Splitting standard %s (~%d tokens) across requests", standard, tokens)
+            batches.extend(
+                [(standard, piece)] for piece in split_standard(issues, sizes, max_tokens)
+                if len(piece) >= 2  # a lone issue has nothing to merge with
+            )
+            continue
+        if tokens >= LARGE_STANDARD_TOKENS:
+            batches.append([(standard, issues)])
+            continue
+        if small_batch and small_batch_tokens + tokens > max_tokens:
+            batches.append(small_batch)
+            small_batch, small_batch_tokens = [], 0
+        small_batch.append((standard, issues))
+        small_batch_tokens += tokens
+    if small_batch:
+        batches.append(small_batch)
+    return batches
+
+def send_merge_batches(batches: List[List[Tuple[str, List[Dict]]]], use_batch_api: bool = False) -> List:
+    """Sends one merge request per batch - the reply text, or the exception, for each one"""
+    prompts = [create_merge_analysis_prompt(batch) for batch in batches]
+    if not prompts:
+        return []
+    if use_batch_api:
+        return asyncio.run(run_batch_prompts(prompts, MERGE_SYSTEM_PROMPT, response_format=MERGE_RESPONSE_FORMAT))
+    return asyncio.run(run_prompts(
+        prompts,
+        MERGE_SYSTEM_PROMPT,
+        response_format=MERGE_RESPONSE_FORMAT,
+        return_exceptions=True
+    ))
+
+def collect_merge_groups(
+    batches: List[List[Tuple[str, List[Dict]]]],
+    responses: List,
+    standard_results: Dict[str, List[Dict]],
+    failed_standards: set
+) -> List[Tuple[str, List[Dict]]]:
+    """
+    Files each reply's merge groups under their standard in standard_results, matching
+    them up by the standard_id each standard was sent with. Standards whose request
+    failed go in failed_standards. Returns the (standard, issues) pieces the model left
+    out of its reply, so they can be asked about again.
+    """
+    missing = []
+    for batch, response_text in zip(batches, responses):
+        batch_standards = ", ".join(standard for standard, _ in batch)
+        if isinstance(response_text, BaseException):
+            logger.error(f"Error processing standards {batch_standards}: {str(response_text)}")
+            failed_standards.update(standard for standard, _ in batch)
+            continue
+        
+        # Parse the response
+        logger.debug("Raw LLM response:\n%s", response_text)
+        
+        try:
+            # Schema mode means the reply is bare JSON - no markdown fences to strip
+            returned = {}
+            for result in json_utils.loads(response_text)["results"]:
+                returned.setdefault(result["standard_id"], []).extend(result["merge_groups"])
+        except json_utils.JSONDecodeError as e:
+            # Only happens if the reply got cut off (e.g. hit the token limit)
+            logger.warning(f"Error parsing LLM response for standards {batch_standards}: {str(e)}")
+            failed_standards.update(standard for standard, _ in batch)
+            continue
+        except Exception as e:
+            logger.error(f"Error processing standards {batch_standards}: {str(e)}")
+            failed_standards.update(standard for standard, _ in batch)
+            continue
+        
+        unknown_ids = set(returned) - set(range(len(batch)))
+        if unknown_ids:
+            logger.warning("Ignoring merge groups for unknown standard_id(s) %s in the reply for %s", sorted(unknown_ids), batch_standards)
+        for standard_id, (standard, issues) in enumerate(batch):
+            if standard_id in returned:
+                standard_results.setdefault(standard, []).extend(returned[standard_id])
+            else:
+                missing.append((standard, issues))
+    return missing
+
+def analyze_issues_for_merge(df: pd.DataFrame, use_batch_api: bool = False) -> List[Dict]:
     """
     Main merge analysis function - uses GPT-4o to find similar issues.
     Returns suggestions for which issues we should combine.
+    use_batch_api sends the requests as one Batch API job instead (see analyze_issues_for_merge_batch).
     """
     all_merge_suggestions = []
     processed_issues = set()  # Track which issues have been included in suggestions
     
-    # Filter for unmerged issues only
-    unmerged_mask = (
-        pd.isna(df["Status"]) & 
-        pd.isna(df["Merged With Issue ID"]) & 
-        pd.isna(df["Merged IDs"])
-    )
-    open_issues_df = df[unmerged_mask].copy()
+    # Filter for unmerged issues only - AND the null flags into one buffer, no intermediate masks.
+    # Only the columns the prompt uses get pulled out, and nothing below mutates them so no copy
+    unmerged_mask = df["Status"].isna().to_numpy()
+    np.logical_and(unmerged_mask, df["Merged With Issue ID"].isna().to_numpy(), out=unmerged_mask)
+    np.logical_and(unmerged_mask, df["Merged IDs"].isna().to_numpy(), out=unmerged_mask)
+    open_issues_df = df.loc[unmerged_mask, MERGE_ISSUE_COLUMNS]
     
-    print(f"\n[DEBUG] Status value counts before filtering:\n{df['Status'].value_counts(dropna=False)}")
-    print(f"[DEBUG] Found {len(open_issues_df)} unmerged issues out of {len(df)} total issues")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Status value counts before filtering:\n%s", df["Status"].value_counts(dropna=False))
+    logger.debug("Found %d unmerged issues out of %d total issues", len(open_issues_df), len(df))
     
     if len(open_issues_df) == 0:
-        print("[DEBUG] No unmerged issues found to analyze")
+        logger.debug("No unmerged issues found to analyze")
         return []
     
-    # Group issues by standard first
-    standards = open_issues_df["Linked Standard"].unique()
-    print(f"[DEBUG] Found {len(standards)} unique standards to analyze")
+    # Strip the standard names once up front - a stray space would otherwise split a standard in two
+    linked_standards = normalize_standards(open_issues_df["Linked Standard"])
     
-    for standard in standards:
-        # Get all issues for this standard
-        standard_df = open_issues_df[open_issues_df["Linked Standard"] == standard]
-        print(f"\n[DEBUG] Processing standard: {standard}")
-        print(f"[DEBUG] Found {len(standard_df)} unmerged issues for this standard")
-        
-        # Skip if less than 2 issues for this standard
-        if len(standard_df) < 2:
-            print("[DEBUG] Skipping standard - less than 2 issues")
-            continue
+    # Standards with less than 2 issues have nothing to merge - drop them before grouping
+    standard_counts = linked_standards.value_counts(sort=False)
+    multi_standards = standard_counts.index[standard_counts.to_numpy() >= 2]
+    logger.debug("Skipping %d standards with less than 2 issues", len(standard_counts) - len(multi_standards))
+    if len(multi_standards) < len(standard_counts):
+        keep = linked_standards.isin(multi_standards).to_numpy()
+        open_issues_df, linked_standards = open_issues_df[keep], linked_standards[keep]
+    
+    # Group issues by standard first - one hash pass instead of a full scan per standard
+    standard_groups = open_issues_df.groupby(linked_standards, sort=False, observed=True)
+    logger.debug("Found %d unique standards to analyze", standard_groups.ngroups)
+    
+    # Build every standard's request first - the pandas side stays synchronous
+    tasks = []
+    for standard, standard_df in standard_groups:
+        logger.debug("Processing standard: %s (%d unmerged issues)", standard, len(standard_df))
         
-        # Create list of all unprocessed issues for this standard
-        standard_issues = []
-        for _, row in standard_df.iterrows():
-            issue_id = row["Issue ID"]
-            # Skip if this issue has already been processed
-            if issue_id in processed_issues:
-                continue
-                
-            issue = {
+        # Create list of all issues for this standard - zipping the column arrays
+        # skips the per-row Series iterrows() would build
+        standard_issues = [
+            {
                 "issue_id": issue_id,
-                "input_prompt": row["Input Prompt"],
-                "failure_rationale": row["Failure Rationale"],
-                "linked_standard": row["Linked Standard"].strip(),
-                "final_score": row["Final Weighted Score (1-3)"]
+                "input_prompt": truncate_text(input_prompt),
+                "failure_rationale": truncate_text(failure_rationale),
+                "linked_standard": standard,
+                "final_score": final_score
             }
-            standard_issues.append(issue)
+            for issue_id, input_prompt, failure_rationale, final_score in zip(
+                *(standard_df[col].to_numpy() for col in MERGE_ISSUE_COLUMNS if col != "Linked Standard")
+            )
+        ]
         
-        # Skip if no unprocessed issues
+        # Only send issues that look like they have a merge partner
+        standard_issues = filter_merge_candidates(standard_issues)
         if len(standard_issues) < 2:
-            print("[DEBUG] No unprocessed issues for this standard")
+            logger.debug("No similar issues for this standard - skipping LLM call")
             continue
             
-        print(f"[DEBUG] Analyzing {len(standard_issues)} unprocessed issues for standard {standard}")
+        logger.debug("Analyzing %d issues for standard %s", len(standard_issues), standard)
+        tasks.append((standard, standard_issues))
+    
+    if not tasks:
+        return []
+    
+    # Reuse merge groups for any standard whose issues we've already sent as-is
+    standard_results = {}
+    cache_keys = {}
+    for standard, standard_issues in tasks:
+        cache_keys[standard] = make_merge_cache_key(standard, standard_issues)
+        cached_groups = merge_cache.get(cache_keys[standard])
+        if cached_groups is not None:
+            standard_results[standard] = cached_groups
+    uncached_tasks = [(standard, issues) for standard, issues in tasks if standard not in standard_results]
+    logger.debug("Reusing cached merge groups for %d of %d standards", len(standard_results), len(tasks))
+    
+    # Send all the requests at once - wall time is the slowest request, not the sum of them
+    batches = batch_merge_requests(uncached_tasks)
+    logger.debug("Sending %d merge request(s) for %d standards to LLM...", len(batches), len(uncached_tasks))
+    responses = send_merge_batches(batches, use_batch_api)
+    
+    # Big standards can be split over several requests, so results get collected per standard
+    # and only cached once every piece of that standard came back
+    failed_standards = set()
+    missing = collect_merge_groups(batches, responses, standard_results, failed_standards)
+    
+    # A standard left out of a batched reply gets asked about again on its own - never
+    # cached as "nothing to merge" just because the model skipped it
+    if missing:
+        logger.warning("Merge reply left out %d standard(s), retrying each on its own: %s", len(missing), ", ".join(standard for standard, _ in missing))
+        retry_batches = [[piece] for piece in missing]
+        retry_responses = send_merge_batches(retry_batches, use_batch_api)
+        for standard, _ in collect_merge_groups(retry_batches, retry_responses, standard_results, failed_standards):
+            logger.error(f"Merge reply left out standard {standard} again - skipping it this run")
+            failed_standards.add(standard)
+    
+    for standard, _ in uncached_tasks:
+        if standard not in failed_standards:
+            merge_cache.set(cache_keys[standard], standard_results.get(standard, []))
+    
+    # Dedup after the fact - the parallel requests can't share processed_issues
+    for standard, standard_issues in tasks:
+        new_suggestions = standard_results.get(standard, [])
+        # Batched requests cover several standards, so make sure each group stays inside its own
+        standard_ids = {issue["issue_id"] for issue in standard_issues}
         
-        try:
-            print("\n[DEBUG] Sending request to LLM...")
-            completion = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are an expert at analyzing QA issues and identifying patterns and similarities between issues.
-                        When analyzing issues:
-                        1. Look for similar root causes or overlapping problems
-                        2. Issues with similar themes or patterns should be merged
-                        3. Consider all possible relationships between issues
-                        4. Group related issues together - don't split them across multiple suggestions
-                        5. Only suggest merges when there is strong similarity (confidence >= 0.8)
-                        6. You can suggest multiple issues be merged together if they are all related"""
-                    },
-                    {
-                        "role": "user",
-                        "content": create_merge_analysis_prompt(standard_issues)
-                    }
-                ],
-                temperature=0.3  # Lower temperature for more consistent analysis
-            )
-            
-            # Parse the response
-            response_text = completion.choices[0].message.content
-            print("\n[DEBUG] Raw LLM response:")
-            print(response_text)
-            
-            try:
-                # Clean up the response text to handle markdown formatting
-                cleaned_response = response_text.strip()
-                if cleaned_response.startswith("```"):
-                    cleaned_response = cleaned_response.split("```")[1]
-                    if cleaned_response.startswith("json"):
-                        cleaned_response = cleaned_response[4:]
-                    cleaned_response = cleaned_response.strip()
-                
-                merge_suggestions = json.loads(cleaned_response)
-                new_suggestions = merge_suggestions.get("merge_groups", [])
-                
-                # Filter out suggestions that include already processed issues
-                valid_suggestions = []
-                for suggestion in new_suggestions:
-                    issues = suggestion["issues"]
-                    if not any(issue in processed_issues for issue in issues):
-                        # Only accept high confidence suggestions
-                        if suggestion["confidence"] >= 0.8:
-                            valid_suggestions.append(suggestion)
-                            # Mark these issues as processed
-                            processed_issues.update(issues)
-                
-                print(f"[DEBUG] Found {len(valid_suggestions)} valid merge suggestions")
-                all_merge_suggestions.extend(valid_suggestions)
-                
-            except json.JSONDecodeError as e:
-                print(f"[DEBUG] Error parsing LLM response: {str(e)}")
+        # Filter out suggestions that include already processed issues - most confident
+        # first, so when two groups overlap the stronger one wins
+        valid_suggestions = []
+        for suggestion in sorted(new_suggestions, key=lambda suggestion: suggestion["confidence"], reverse=True):
+            issues = suggestion["issues"]
+            if not all(issue in standard_ids for issue in issues):
                 continue
-            
-        except Exception as e:
-            print(f"[DEBUG] Error processing standard {standard}: {str(e)}")
-            continue
+            if not any(issue in processed_issues for issue in issues):
+                # Only accept high confidence suggestions
+                if suggestion["confidence"] >= 0.8:
+                    valid_suggestions.append(suggestion)
+                    # Mark these issues as processed
+                    processed_issues.update(issues)
+        
+        logger.debug("Found %d valid merge suggestions for %s", len(valid_suggestions), standard)
+        all_merge_suggestions.extend(valid_suggestions)
     
-    print(f"\n[DEBUG] Analysis complete")
-    print(f"[DEBUG] Found {len(all_merge_suggestions)} total merge suggestions")
+    logger.debug("Analysis complete - found %d total merge suggestions", len(all_merge_suggestions))
     return all_merge_suggestions
 
-def apply_merges(df: pd.DataFrame, merge_suggestions: List[Dict]) -> Tuple[pd.DataFrame, List[Dict]]:
+def analyze_issues_for_merge_batch(df: pd.DataFrame) -> List[Dict]:
+    """
+    Merge analysis through OpenAI's Batch API - half the cost of analyze_issues_for_merge,
+    but it blocks until the job finishes, which can take hours. Meant for offline runs
+    over big datasets, not the interactive app.
+    """
+    return analyze_issues_for_merge(df, use_batch_api=True)
+
+def apply_merges(df: pd.DataFrame, merge_suggestions: List[Dict], inplace: bool = False) -> Tuple[pd.DataFrame, List[Dict]]:
     """
     Takes merge suggestions and actually applies them to our data.
     Returns both the updated data and a log of what we merged.
+    Pass inplace=True if df is already a copy you own, to skip copying it again.
     """
     merge_actions = []
-    df = df.copy()
+    if not inplace:
+        df = copy_for_merge(df, ["Status", "Merged IDs", "Merged With Issue ID"])
+    
+    # Look up rows by position instead of scanning the Issue ID column for every suggestion
+    id_to_pos = {issue_id: pos for pos, issue_id in enumerate(df["Issue ID"].to_numpy())}
+    merged_ids_col = df.columns.get_loc("Merged IDs")
+    merged_ids_values = df["Merged IDs"].to_numpy(dtype=object, copy=True)
+    primary_positions = set()
+    secondary_positions, secondary_primaries = [], []
     
     for suggestion in merge_suggestions:
         if suggestion["confidence"] >= 0.8:  # Only apply high-confidence merges
@@ -206,17 +457,30 @@ def apply_merges(df: pd.DataFrame, merge_suggestions: List[Dict]) -> Tuple[pd.Da
                 merge_actions.append(merge_action)
                 
                 # Update the Merged IDs field for the primary issue
-                merged_ids = df.loc[df["Issue ID"] == primary_issue, "Merged IDs"].iloc[0]
+                primary_pos = id_to_pos[primary_issue]
+                merged_ids = merged_ids_values[primary_pos]
                 if pd.isna(merged_ids):
                     merged_ids = ""
-                new_merged_ids = (merged_ids + "," if merged_ids else "") + ",".join(secondary_issues)
-                df.loc[df["Issue ID"] == primary_issue, "Merged IDs"] = new_merged_ids
+                merged_ids_values[primary_pos] = (merged_ids + "," if merged_ids else "") + ",".join(secondary_issues)
+                primary_positions.add(primary_pos)
                 
-                # Mark secondary issues as merged
-                df.loc[df["Issue ID"].isin(secondary_issues), "Status"] = "Merged"
-                df.loc[df["Issue ID"].isin(secondary_issues), "Merged With Issue ID"] = primary_issue
+                # Queue up the secondary issues to be marked as merged (unknown IDs are skipped)
+                for issue in secondary_issues:
+                    pos = id_to_pos.get(issue)
+                    if pos is not None:
+                        secondary_positions.append(pos)
+                        secondary_primaries.append(primary_issue)
+    
+    # Write everything back in one go - one assignment per column instead of three per suggestion
+    if primary_positions:
+        positions = np.fromiter(primary_positions, dtype=np.intp)
+        df.iloc[positions, merged_ids_col] = merged_ids_values[positions]
+    if secondary_positions:
+        positions = np.array(secondary_positions, dtype=np.intp)
+        df.iloc[positions, df.columns.get_loc("Status")] = "Merged"
+        df.iloc[positions, df.columns.get_loc("Merged With Issue ID")] = np.array(secondary_primaries, dtype=object)
     
     return df, merge_actions
 
 # These are the functions other modules should use
-__all__ = ['create_merge_analysis_prompt', 'analyze_issues_for_merge', 'apply_merges']
+__all__ = ['create_merge_analysis_prompt', 'analyze_issues_for_merge', 'analyze_issues_for_merge_batch', 'apply_merges', 'merge_cache']
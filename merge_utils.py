@@ -1,8 +1,12 @@
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import json
+import logging
 import os
+import threading
+import json_utils
 
 """
 # QA Issue Merge Utilities
@@ -13,67 +17,231 @@ import os
 # Includes validation, auditing, and the actual merge logic.
 """
 
+logger = logging.getLogger(__name__)
+
+# Fields whose values get combined into the primary issue on a merge
+COMBINED_FIELDS = ["Input Prompt", "Failure Rationale"]
+
+# Every column a merge writes to
+MERGE_WRITE_COLUMNS = ["Status", "Merged IDs", "Merged With Issue ID"] + COMBINED_FIELDS
+
+def copy_for_merge(df: pd.DataFrame, columns: List[str] = MERGE_WRITE_COLUMNS) -> pd.DataFrame:
+    """
+    A copy of df that's safe to merge into without touching the original.
+    Only the columns a merge writes to get their own data - the rest are shared
+    with df, so we don't duplicate the whole frame for a few cell updates.
+    """
+    df = df.copy(deep=False)
+    for column in columns:
+        if column in df.columns:
+            df[column] = df[column].copy()
+    return df
+
+def normalize_standards(standards: pd.Series) -> pd.Series:
+    """
+    Standard names as compared for merging - stripped, so "Std A" and "Std A " count as one.
+    Everything that groups or checks issues by standard goes through this.
+    """
+    return standards.astype("string").str.strip()
+
+def locate_issues(df: pd.DataFrame, issues: List[str]) -> np.ndarray:
+    """
+    Finds the row position of each issue ID (-1 if it's not there) with one hash lookup
+    per ID, instead of scanning the whole Issue ID column for each one.
+    If an ID shows up more than once, the first row wins.
+    """
+    index = pd.Index(df["Issue ID"])
+    if index.is_unique:
+        return index.get_indexer(issues)
+    first_rows = ~index.duplicated()
+    positions = index[first_rows].get_indexer(issues)
+    return np.where(positions >= 0, np.flatnonzero(first_rows)[positions], -1)
+
 class MergeValidator:
     """Makes sure we don't corrupt data when merging issues"""
     
     @staticmethod
-    def validate_merge_group(df: pd.DataFrame, issues: List[str]) -> Tuple[bool, str]:
+    def validate_merge_group(df: pd.DataFrame, issues: List[str], positions: Optional[np.ndarray] = None) -> Tuple[bool, str]:
         """
         Checks if we can safely merge a group of issues.
+        positions are the issues' rows from locate_issues, if the caller already has them.
         Returns (ok_to_merge, error_msg).
         """
         if len(issues) < 2:
             return False, "Need at least 2 issues to merge"
+        if positions is None:
+            positions = locate_issues(df, issues)
             
         # Check if all issues exist
-        existing_issues = df["Issue ID"].tolist()
-        missing_issues = [issue for issue in issues if issue not in existing_issues]
+        missing_issues = [issue for issue, position in zip(issues, positions) if position < 0]
         if missing_issues:
             return False, f"Issues not found: {', '.join(missing_issues)}"
             
-        # Check if any issues are already merged
-        merged_issues = df[df["Status"] == "Merged"]["Issue ID"].tolist()
-        already_merged = [issue for issue in issues if issue in merged_issues]
+        # Check if any issues are already merged - only the group's own rows get looked at
+        is_merged = (df["Status"].iloc[positions] == "Merged").to_numpy()
+        already_merged = [issue for issue, merged in zip(issues, is_merged) if merged]
         if already_merged:
             return False, f"Issues already merged: {', '.join(already_merged)}"
             
         # Check if issues share the same standard
-        standards = df[df["Issue ID"].isin(issues)]["Linked Standard"].unique()
+        standards = normalize_standards(df["Linked Standard"].iloc[positions]).unique()
         if len(standards) > 1:
             return False, f"Issues have different standards: {', '.join(standards)}"
             
         return True, ""
 
+class _LogTail:
+    """
+    Reads an append-only log incrementally - remembers how far it got, and starts over
+    if the file is cleared or replaced. items holds parse(offset, line) for every entry.
+    """
+    
+    def __init__(self, parse: Callable[[int, bytes], Any]):
+        self.parse = parse
+        self.lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        self.items: List[Any] = []
+        self.size = 0
+        self.inode = None
+    
+    def update(self, path: str) -> None:
+        """Picks up every complete line appended since last time. Call with lock held"""
+        try:
+            stat = os.stat(path)
+            size, inode = stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            size, inode = 0, None
+        if size < self.size or inode != self.inode:
+            # Log was cleared or replaced - start over
+            self.reset()
+            self.inode = inode
+        if size > self.size:
+            with open(path, "rb") as f:
+                f.seek(self.size)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # still being written - pick it up next time
+                    if line.strip():
+                        self.items.append(self.parse(self.size, line))
+                    self.size += len(line)
+
 class MergeAuditor:
     """Keeps track of what we merged and when"""
     
     def __init__(self, audit_file: str = "merge_audit.jsonl"):
         self.audit_file = audit_file
+        # Byte offset of every line in the log, for the pager. The log is append-only,
+        # so the index only ever needs extending
+        self._line_index = _LogTail(lambda offset, line: offset)
+        # Parsed entries for get_merge_history, tailed the same way
+        self._history = _LogTail(lambda offset, line: json_utils.loads(line))
+        # Append handle kept open between merges, instead of an open/close per entry
+        self._audit_handle = None
+        self._audit_handle_inode = None
+        self._write_lock = threading.Lock()
+        
+    def _get_audit_handle(self):
+        """Returns the open append handle, reopening it if the log was deleted or replaced"""
+        try:
+            inode = os.stat(self.audit_file).st_ino
+        except FileNotFoundError:
+            inode = None
+        if self._audit_handle is None or inode != self._audit_handle_inode:
+            self._close_audit_handle()
+            # Line-buffered, so each entry reaches the file as soon as its newline is written
+            self._audit_handle = open(self.audit_file, "a", buffering=1, encoding="utf-8")
+            self._audit_handle_inode = os.fstat(self._audit_handle.fileno()).st_ino
+        return self._audit_handle
+    
+    def _close_audit_handle(self) -> None:
+        if self._audit_handle is not None:
+            self._audit_handle.close()
+            self._audit_handle = None
+            self._audit_handle_inode = None
+    
+    def close(self) -> None:
+        """Flushes and closes the audit log handle"""
+        with self._write_lock:
+            self._close_audit_handle()
+    
+    def __del__(self):
+        try:
+            self._close_audit_handle()
+        except Exception:
+            pass
         
     def log_merge(self, merge_action: Dict) -> None:
         """Writes merge details to our audit log"""
-        audit_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "action": "merge",
-            **merge_action
-        }
+        self.log_merges([merge_action])
+    
+    def log_merges(self, merge_actions: List[Dict]) -> None:
+        """
+        Writes a batch of merges to the audit log in one write on the shared handle,
+        instead of reopening the file for every entry.
+        """
+        if not merge_actions:
+            return
+        timestamp = datetime.now().isoformat()
+        lines = "".join(
+            json_utils.dumps({"timestamp": timestamp, "action": "merge", **merge_action}) + "\n"
+            for merge_action in merge_actions
+        )
         
-        with open(self.audit_file, "a") as f:
-            f.write(json.dumps(audit_entry) + "\n")
+        # The executor is shared between sessions, so one writer at a time
+        with self._write_lock:
+            self._get_audit_handle().write(lines)
     
     def get_merge_history(self, use_cache: bool = True) -> List[Dict]:
-        """Pulls up our merge history from the log file"""
+        """
+        Pulls up our merge history from the log file.
+        use_cache=False throws away what we've parsed so far and rereads the whole log.
+        """
         if not use_cache:
-            return []
-            
-        try:
-            with open(self.audit_file, "r") as f:
-                return [json.loads(line) for line in f]
-        except FileNotFoundError:
-            return []
+            self._reset_history()
+        
+        # Only parse what's been appended since the last call
+        with self._history.lock:
+            self._history.update(self.audit_file)
+            return list(self._history.items)
             
+    def _reset_history(self) -> None:
+        """Forgets the parsed history and line index so the next read starts from scratch"""
+        for tail in (self._history, self._line_index):
+            with tail.lock:
+                tail.reset()
+    
+    def _update_line_index(self) -> List[int]:
+        """Indexes any lines appended since last time. Returns the offset of every entry in the log"""
+        with self._line_index.lock:
+            self._line_index.update(self.audit_file)
+            return self._line_index.items
+    
+    def get_merge_history_page(self, limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Reads one page of merge history, newest first, without parsing the whole log.
+        offset counts back from the newest entry. Returns (entries, total entries in the log).
+        """
+        line_offsets = self._update_line_index()
+        total = len(line_offsets)
+        end = max(total - offset, 0)
+        start = max(end - limit, 0)
+        if start == end:
+            return [], total
+        
+        with open(self.audit_file, "rb") as f:
+            entries = []
+            for line_offset in line_offsets[start:end]:
+                f.seek(line_offset)
+                entries.append(json_utils.loads(f.readline()))
+        entries.reverse()
+        return entries, total
+    
     def clear_cache(self) -> bool:
         """Wipes out the merge history if needed"""
+        self.close()
+        self._reset_history()
         try:
             if os.path.exists(self.audit_file):
                 os.remove(self.audit_file)
@@ -90,11 +258,21 @@ class MergeAuditor:
         - A secondary issue in someone else's merge
         - The primary issue in a merge
         """
-        return len(df[
-            pd.isna(df["Status"]) & 
-            pd.isna(df["Merged With Issue ID"]) & 
-            pd.isna(df["Merged IDs"])
-        ])
+        # One bool array, ANDed in place, instead of a temporary per & and a 3-column frame
+        unmerged = df["Status"].isna().to_numpy()
+        unmerged &= df["Merged With Issue ID"].isna().to_numpy()
+        unmerged &= df["Merged IDs"].isna().to_numpy()
+        return int(np.count_nonzero(unmerged))
+
+def _bulleted(values: List[str]) -> str:
+    """Combine rationales with bullets"""
+    return "\n".join(f"• {v}" for v in values)
+
+# How combine_field_values merges each field's (cleaned, de-duplicated) values.
+# Anything not listed just keeps the first non-empty value
+FIELD_COMBINERS = {
+    "Failure Rationale": _bulleted,
+}
 
 class MergeExecutor:
     """Handles the actual merge operations with safety checks"""
@@ -108,54 +286,59 @@ class MergeExecutor:
         Figures out how to combine values from different issues.
         Each field type needs its own rules for combining.
         """
-        # Remove empty values and duplicates
-        values = [str(v) for v in values if pd.notna(v) and str(v).strip()]
-        values = list(dict.fromkeys(values))
+        # Non-empty values as strings, converted once each
+        non_empty = (text for text in (str(v) for v in values if pd.notna(v)) if text.strip())
+        
+        combiner = FIELD_COMBINERS.get(field)
+        if combiner is None:
+            # Default: use the first non-empty value - no need to look past it
+            return next(non_empty, "")
+        
+        # Remove duplicates
+        values = list(dict.fromkeys(non_empty))
         
         if not values:
             return ""
-            
-        if field == "Final Weighted Score (1-3)":
-            # Use the highest score
-            return max(float(v) for v in values)
-        elif field == "Failure Rationale":
-            # Combine rationales with bullets
-            return "\n".join(f"• {v}" for v in values)
-        elif field == "Investigation Notes":
-            # Combine notes with timestamps
-            return "\n\n".join(f"[Previous Note] {v}" for v in values)
-        else:
-            # Default: use the first non-empty value
-            return values[0]
-    
-    def execute_merge(self, df: pd.DataFrame, merge_suggestion: Dict) -> Tuple[pd.DataFrame, Optional[Dict]]:
+        return combiner(values)
+    
+    def execute_merge(self, df: pd.DataFrame, merge_suggestion: Dict, inplace: bool = False, log: bool = True) -> Tuple[pd.DataFrame, Optional[Dict]]:
         """
         Does the actual merge after running safety checks.
         Returns the updated data and what we did, or None if something went wrong.
+        By default df is left alone and a merged copy comes back. When applying a lot of
+        merges, copy once yourself (copy_for_merge) and pass inplace=True so each merge doesn't copy again,
+        and log=False to collect the actions and write them with auditor.log_merges() at the end.
         """
         # Get the selected issues (if available) or use all issues
         issues = merge_suggestion.get("selected_issues", merge_suggestion["issues"])
         
+        # Find the group's rows once - validation and every update below reuse them
+        positions = locate_issues(df, issues)
+        
         # Validate the merge group
-        is_valid, error = self.validator.validate_merge_group(df, issues)
+        is_valid, error = self.validator.validate_merge_group(df, issues, positions)
         if not is_valid:
-            print(f"[ERROR] Merge validation failed: {error}")
+            logger.error(f"Merge validation failed: {error}")
             return df, None
             
         # Extract issue information
         primary_issue = issues[0]
         secondary_issues = issues[1:]
+        primary_position = positions[0]
+        secondary_positions = positions[1:]
+        status_col = df.columns.get_loc("Status")
         
-        # Create a copy of the DataFrame
-        df = df.copy()
+        # Copy the columns we write to unless the caller already has a copy
+        if not inplace:
+            df = copy_for_merge(df)
         
         # Update primary issue
-        df.loc[df["Issue ID"] == primary_issue, "Status"] = "Primary"
+        df.iloc[primary_position, status_col] = "Primary"
         
         # Get all field values for combining
         all_values = {
-            field: df[df["Issue ID"].isin(issues)][field].tolist()
-            for field in ["Input Prompt", "Failure Rationale"]
+            field: df[field].iloc[positions].tolist()
+            for field in COMBINED_FIELDS
         }
         
         # Combine field values
@@ -166,15 +349,14 @@ class MergeExecutor:
         
         # Update primary issue with combined values
         for field, value in combined_values.items():
-            df.loc[df["Issue ID"] == primary_issue, field] = value
+            df.iloc[primary_position, df.columns.get_loc(field)] = value
             
         # Track merged IDs in primary issue
-        df.loc[df["Issue ID"] == primary_issue, "Merged IDs"] = json.dumps(secondary_issues)
+        df.iloc[primary_position, df.columns.get_loc("Merged IDs")] = json.dumps(secondary_issues)
         
         # Update secondary issues
-        for issue_id in secondary_issues:
-            df.loc[df["Issue ID"] == issue_id, "Status"] = "Merged"
-            df.loc[df["Issue ID"] == issue_id, "Merged With Issue ID"] = primary_issue
+        df.iloc[secondary_positions, status_col] = "Merged"
+        df.iloc[secondary_positions, df.columns.get_loc("Merged With Issue ID")] = primary_issue
             
         # Create merge action for audit
         merge_action = {
@@ -185,6 +367,30 @@ class MergeExecutor:
         }
         
         # Log the merge action
-        self.auditor.log_merge(merge_action)
+        if log:
+            self.auditor.log_merge(merge_action)
         
         return df, merge_action
+    
+    def execute_merges(self, df: pd.DataFrame, merge_suggestions: List[Dict]) -> Tuple[pd.DataFrame, List[Dict]]:
+        """
+        Applies a list of merge suggestions in one go - one copy of the merge columns and
+        one audit log write for the lot, instead of one of each per merge.
+        Suggestions that fail validation, or share an issue with an earlier one, are skipped.
+        Returns the updated data and the merges that went through.
+        """
+        df = copy_for_merge(df)
+        merge_actions = []
+        claimed = set()
+        for merge_suggestion in merge_suggestions:
+            issues = merge_suggestion.get("selected_issues", merge_suggestion["issues"])
+            if claimed.intersection(issues):
+                logger.error("Merge validation failed: Issues already in another merge in this batch")
+                continue
+            df, merge_action = self.execute_merge(df, merge_suggestion, inplace=True, log=False)
+            if merge_action:
+                claimed.update(issues)
+                merge_actions.append(merge_action)
+        
+        self.auditor.log_merges(merge_actions)
+        return df, merge_actions
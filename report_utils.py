@@ -7,10 +7,16 @@
 # Uses matplotlib for charts and FPDF for the PDF output.
 """
 
-from typing import Dict, List
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 from datetime import datetime
+import io
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+import matplotlib
+# Charts only ever go to PNG files - no need for a GUI backend
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import os
 import logging
@@ -18,8 +24,7 @@ import seaborn as sns
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
 
-# Basic logging setup
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured by the app - we just grab our logger
 logger = logging.getLogger(__name__)
 
 # Tweaked matplotlib to make charts look better
@@ -71,30 +76,13 @@ class QAReport(FPDF):
     def body_text(self, text: str):
         """Handles regular text with smart line wrapping"""
         self.set_font('Arial', '', 11)
-        # Calculate maximum line width
-        max_width = self.w - 2 * self.l_margin
-        # Split text into lines that fit within the page width
-        lines = text.split('\n')
-        for line in lines:
-            words = line.split()
-            current_line = ''
-            for word in words:
-                # Test if adding this word would exceed the line width
-                test_line = current_line + (' ' if current_line else '') + word
-                if self.get_string_width(test_line) > max_width:
-                    # Current line is full, print it and start a new one
-                    if current_line:
-                        self.cell(0, 5, current_line.strip(), ln=True)
-                        current_line = word
-                    else:
-                        # Word is too long for the line, need to split it
-                        self.cell(0, 5, word, ln=True)
-                        current_line = ''
-                else:
-                    current_line = test_line
-            # Print the last line if there is one
-            if current_line:
-                self.cell(0, 5, current_line.strip(), ln=True)
+        # multi_cell does the wrapping off cached glyph widths, instead of us
+        # re-measuring a growing prefix for every word
+        for line in text.split('\n'):
+            # Same spacing as before - runs of whitespace collapse, blank lines are skipped
+            line = ' '.join(line.split())
+            if line:
+                self.multi_cell(0, 5, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         self.ln(2)
     
     def bullet_points(self, points: List[str]):
@@ -104,12 +92,14 @@ class QAReport(FPDF):
             self.cell(5, 5, "•", ln=0)
             self.cell(0, 5, point, ln=True)
     
-    def add_chart(self, image_path: str, caption: str = None):
-        """Drops in a chart and centers it"""
-        if os.path.exists(image_path):
+    def add_chart(self, image: Union[str, bytes], caption: str = None):
+        """Drops in a chart (PNG bytes from render_chart, or an image path) and centers it"""
+        if isinstance(image, bytes):
+            image = io.BytesIO(image)  # fpdf2 reads the image straight from memory
+        if not isinstance(image, str) or os.path.exists(image):
             # Calculate image dimensions to fit page width
             img_width = self.w - 2 * self.l_margin
-            self.image(image_path, x=self.l_margin, w=img_width)
+            self.image(image, x=self.l_margin, w=img_width)
             if caption:
                 self.set_font('Arial', 'I', 10)
                 self.cell(0, 5, caption, ln=True, align="C")
@@ -117,61 +107,115 @@ class QAReport(FPDF):
 
 def save_chart(fig, filename: str) -> bool:
     """Saves matplotlib charts as PNG files"""
+    # Figures made with the Figure API (no pyplot manager) are just dropped, not closed through pyplot
+    managed = getattr(fig.canvas, "manager", None) is not None
     try:
-        logger.debug(f"Attempting to save {filename}")
+        logger.debug("Attempting to save %s", filename)
         fig.savefig(filename, bbox_inches='tight', dpi=100)
-        plt.close(fig)  # Close the figure to free memory
-        logger.debug(f"Successfully saved {filename}")
+        if managed:
+            plt.close(fig)  # Close the figure to free memory
+        logger.debug("Successfully saved %s", filename)
         return True
     except Exception as e:
         logger.error(f"Error saving {filename}: {str(e)}")
-        plt.close(fig)  # Make sure to close even on error
+        if managed:
+            plt.close(fig)  # Make sure to close even on error
         return False
 
+def render_chart(fig) -> Optional[bytes]:
+    """Renders a matplotlib chart to PNG bytes in memory - no temp file to write, read back and delete"""
+    managed = getattr(fig.canvas, "manager", None) is not None
+    try:
+        buffer = io.BytesIO()
+        # Every chart already calls tight_layout, so skip bbox_inches='tight' -
+        # it costs a whole extra draw just to measure the figure
+        fig.savefig(buffer, format='png', dpi=100)
+        return buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error rendering chart: {str(e)}")
+        return None
+    finally:
+        if managed:
+            plt.close(fig)
+
+def _report_masks(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Row masks for (issues the report covers, merged groups) - one pass over each column"""
+    is_merged = (df["Status"] == "Merged").to_numpy()  # Merged groups
+    in_report = df["Merged With Issue ID"].isna().to_numpy()  # Unmerged issues
+    in_report |= is_merged
+    return in_report, is_merged
+
+def get_report_issues(df: pd.DataFrame) -> pd.DataFrame:
+    """The issues the report covers - unmerged issues plus merged groups"""
+    return df[_report_masks(df)[0]]
 
-def generate_charts(df: pd.DataFrame, analysis_results: Dict) -> List[str]:
-    """Creates all the charts we need for our report"""
-    chart_files = []
+def render_static_charts(df: pd.DataFrame) -> List[bytes]:
+    """
+    Draws the charts that only need the issue data (not the LLM analysis), so they
+    can be rendered on a worker thread while the analysis is still running.
+    Uses the Figure API rather than pyplot since pyplot isn't thread-safe.
+    Returns each chart as PNG bytes.
+    """
+    charts = []
     
+    # 1. Issues by Standard Bar Chart
+    logger.debug("Generating Issues by Standard chart...")
     try:
-        logger.info("Starting chart generation...")
+        standard_counts = df["Linked Standard"].value_counts()
+        # A categorical column counts every standard, even ones with no issues left in this subset
+        standard_counts = standard_counts[standard_counts > 0]
         
-        # 1. Issues by Standard Bar Chart
-        logger.debug("Generating Issues by Standard chart...")
-        try:
-            standard_counts = df["Linked Standard"].value_counts()
-            
-            fig, ax = plt.subplots(figsize=(10, 6))
-            standard_counts.plot(kind='bar', ax=ax)
-            ax.set_title("Distribution of Issues Across Standards")
-            ax.set_xlabel("Standard")
-            ax.set_ylabel("Number of Issues")
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            
-            standards_chart = "temp_standards_chart.png"
-            if save_chart(fig, standards_chart):
-                chart_files.append(standards_chart)
-                
-        except Exception as e:
-            logger.error(f"Error generating standards chart: {str(e)}")
+        fig = Figure(figsize=(10, 6))
+        FigureCanvas(fig)
+        ax = fig.subplots()
+        ax.bar(range(len(standard_counts)), standard_counts.values)
+        ax.set_xticks(range(len(standard_counts)))
+        ax.set_xticklabels(standard_counts.index.astype(str), rotation=45, ha='right')
+        ax.set_title("Distribution of Issues Across Standards")
+        ax.set_xlabel("Standard")
+        ax.set_ylabel("Number of Issues")
+        fig.tight_layout()
         
-        # 2. Status Distribution Pie Chart
-        logger.debug("Generating Status Distribution chart...")
-        try:
-            status_counts = df["Status"].fillna("Open").value_counts()
+        standards_chart = render_chart(fig)
+        if standards_chart is not None:
+            charts.append(standards_chart)
             
-            fig, ax = plt.subplots(figsize=(8, 8))
-            ax.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%')
-            ax.set_title("Issue Status Distribution")
-            plt.tight_layout()
+    except Exception as e:
+        logger.error(f"Error generating standards chart: {str(e)}")
+    
+    # 2. Status Distribution Pie Chart
+    logger.debug("Generating Status Distribution chart...")
+    try:
+        status_counts = df["Status"].astype(object).fillna("Open").value_counts()
+        
+        fig = Figure(figsize=(8, 8))
+        FigureCanvas(fig)
+        ax = fig.subplots()
+        ax.pie(status_counts.values, labels=status_counts.index, autopct='%1.1f%%')
+        ax.set_title("Issue Status Distribution")
+        fig.tight_layout()
+        
+        status_chart = render_chart(fig)
+        if status_chart is not None:
+            charts.append(status_chart)
             
-            status_chart = "temp_status_chart.png"
-            if save_chart(fig, status_chart):
-                chart_files.append(status_chart)
-                
-        except Exception as e:
-            logger.error(f"Error generating status chart: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating status chart: {str(e)}")
+    
+    return charts
+
+def generate_charts(df: pd.DataFrame, analysis_results: Dict, prerendered: Optional[List[bytes]] = None) -> List[bytes]:
+    """
+    Creates all the charts we need for our report, as PNG bytes.
+    prerendered is the output of render_static_charts if it was already run.
+    """
+    charts = []
+    
+    try:
+        logger.info("Starting chart generation...")
+        
+        # 1-2. Charts that only depend on the data
+        charts.extend(prerendered if prerendered is not None else render_static_charts(df))
         
         # 3. Priority Areas Bar Chart
         logger.debug("Generating Priority Areas chart...")
@@ -181,43 +225,54 @@ def generate_charts(df: pd.DataFrame, analysis_results: Dict) -> List[str]:
                 areas = [area["area"] for area in priority_areas]
                 scores = [area["priority_score"] for area in priority_areas]
                 
-                fig, ax = plt.subplots(figsize=(10, 6))
+                # Figure API like the static charts, so nothing goes through pyplot's global state
+                fig = Figure(figsize=(10, 6))
+                FigureCanvas(fig)
+                ax = fig.subplots()
                 ax.bar(range(len(areas)), scores)
                 ax.set_xticks(range(len(areas)))
                 ax.set_xticklabels(areas, rotation=45, ha='right')
                 ax.set_title("Priority Areas Analysis")
                 ax.set_ylabel("Priority Score")
-                plt.tight_layout()
+                fig.tight_layout()
                 
-                priority_chart = "temp_priority_chart.png"
-                if save_chart(fig, priority_chart):
-                    chart_files.append(priority_chart)
+                priority_chart = render_chart(fig)
+                if priority_chart is not None:
+                    charts.append(priority_chart)
                     
         except Exception as e:
             logger.error(f"Error generating priority areas chart: {str(e)}")
         
-        logger.info(f"Chart generation complete. Generated {len(chart_files)} charts.")
-        return chart_files
+        logger.info("Chart generation complete. Generated %d charts.", len(charts))
+        return charts
         
     except Exception as e:
         logger.error(f"Error in chart generation: {str(e)}")
-        return chart_files
+        return charts
 
-def generate_report(df: pd.DataFrame, analysis_results: Dict, output_path: str = "qa_analysis_report.pdf") -> str:
-    """Puts together the full PDF report with all our analysis"""
+def generate_report(
+    df: pd.DataFrame,
+    analysis_results: Dict,
+    output_path: str = "qa_analysis_report.pdf",
+    out: Optional[BinaryIO] = None,
+    prerendered: Optional[List[bytes]] = None
+) -> Union[str, BinaryIO]:
+    """
+    Puts together the full PDF report with all our analysis.
+    Pass out (e.g. a BytesIO) to get the PDF in memory instead of on disk -
+    then out is returned instead of the path. prerendered is the PNG
+    charts from render_static_charts(get_report_issues(df)), if they were drawn ahead of time.
+    """
     logger.info("Starting report generation...")
-    chart_files = []
     
     try:
-        # Get active issues
-        active_issues = df[
-            (df["Merged With Issue ID"].isna()) |  # Unmerged issues
-            (df["Status"] == "Merged")  # Merged groups
-        ]
+        # Get active issues - the merged mask is kept for the summary counts below
+        in_report, is_merged = _report_masks(df)
+        active_issues = df[in_report]
         
         # Generate charts first
-        logger.info(f"Generating charts for {len(active_issues)} active issues...")
-        chart_files = generate_charts(active_issues, analysis_results)
+        logger.info("Generating charts for %d active issues...", len(active_issues))
+        charts = generate_charts(active_issues, analysis_results, prerendered=prerendered)
         
         logger.info("Creating PDF document...")
         # Create PDF
@@ -229,12 +284,18 @@ def generate_report(df: pd.DataFrame, analysis_results: Dict, output_path: str =
         
         # Add analysis scope explanation
         dataset_coverage = analysis_results.get("summary", {}).get("dataset_coverage", {})
+        # Fallback counts straight off the masks - every merged group is in the report
+        merged_count = int(np.count_nonzero(is_merged))
+        if "standards_count" in dataset_coverage:
+            standards_count = dataset_coverage["standards_count"]
+        else:
+            standards_count = active_issues["Linked Standard"].nunique()
         scope_text = f"""Analysis Scope:
 
 This analysis covers {dataset_coverage.get('total_active_issues', len(active_issues))} active issues:
-- {dataset_coverage.get('merged_groups', len(active_issues[active_issues['Status'] == 'Merged']))} merged issue groups
-- {dataset_coverage.get('unmerged_issues', len(active_issues[active_issues['Status'] != 'Merged']))} unmerged individual issues
-- {dataset_coverage.get('standards_count', len(active_issues['Linked Standard'].unique()))} quality standards evaluated
+- {dataset_coverage.get('merged_groups', merged_count)} merged issue groups
+- {dataset_coverage.get('unmerged_issues', len(active_issues) - merged_count)} unmerged individual issues
+- {standards_count} quality standards evaluated
 
 Note: To avoid redundancy, this analysis excludes individual issues that were previously merged into groups. 
 Each merged group represents multiple related issues that share common patterns or root causes."""
@@ -257,11 +318,10 @@ Each merged group represents multiple related issues that share common patterns
             pdf.ln(5)
         
         # Add visualizations
-        if chart_files:
+        if charts:
             pdf.chapter_title("Data Visualizations")
-            for chart_file in chart_files:
-                if os.path.exists(chart_file):
-                    pdf.add_chart(chart_file)
+            for chart in charts:
+                pdf.add_chart(chart)
         
         # Standards Analysis
         if "standards_analysis" in analysis_results:
@@ -326,29 +386,18 @@ Each merged group represents multiple related issues that share common patterns
                 pdf.ln(5)
         
         # Save the report
-        logger.info(f"Saving report to {output_path}")
-        pdf.output(output_path)
-        
-        # Clean up chart files
-        for chart_file in chart_files:
-            try:
-                if os.path.exists(chart_file):
-                    os.remove(chart_file)
-            except Exception as e:
-                logger.warning(f"Failed to remove chart file {chart_file}: {str(e)}")
+        if out is not None:
+            logger.info("Writing report to memory")
+            out.write(pdf.output())
+        else:
+            logger.info("Saving report to %s", output_path)
+            pdf.output(output_path)
         
-        return output_path
+        return out if out is not None else output_path
         
     except Exception as e:
         logger.error(f"Error generating report: {str(e)}")
-        # Clean up any chart files
-        for chart_file in chart_files:
-            try:
-                if os.path.exists(chart_file):
-                    os.remove(chart_file)
-            except:
-                pass
         raise
 
 # What other files can import
-__all__ = ['generate_report', 'generate_charts', 'save_chart', 'QAReport']
+__all__ = ['generate_report', 'generate_charts', 'render_static_charts', 'get_report_issues', 'render_chart', 'save_chart', 'QAReport']